@@ -0,0 +1,29 @@
+# async_clients.py
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+from exchange_client import ExchangeClient
+from horus_client import HorusClient
+
+# Async facades over the pooled sync clients for the calls the async engine overlaps. Every call
+# runs on a worker thread (asyncio.to_thread), so requests' keep-alive pools, retries, the shared
+# Horus token bucket and the incremental cache are reused as-is. Order placement goes through
+# execution.execute_orders_async, which runs the sync submit path on worker threads.
+
+
+class AsyncHorusClient:
+    def __init__(self, client: HorusClient | None = None):
+        self.sync = client or HorusClient()
+
+    async def fetch_incremental(self, pairs: list[str], lookback: timedelta, end_utc: datetime):
+        return await asyncio.to_thread(self.sync.fetch_incremental, pairs, lookback, end_utc)
+
+
+class AsyncExchangeClient:
+    def __init__(self, client: ExchangeClient | None = None):
+        self.sync = client or ExchangeClient()
+
+    async def get_balance_raw(self):
+        return await asyncio.to_thread(self.sync.get_balance_raw)
@@ -1,96 +1,370 @@
+import argparse
 import csv
+import logging
+import time
 from collections import defaultdict
+from typing import Iterable, Iterator
+
+import numpy as np
 
 import config
-from data_handler import DataHandler
-from strategy import generate_target_weights
+from clock import SimClock
+from data_handler import LiveDataHandler
+from exchange_info import offline_rules
+from horus_client import QUOTE_SUFFIXES, ts_to_epoch_ms
 from portfolio import calc_rebalance_orders
+from price_store import PriceStore
+from strategies.manager import StrategyManager
+
+TickBatch = tuple[int, list[tuple[str, float, float]]]
+
 
+def _to_pair(symbol: str) -> str:
+    s = symbol.upper().replace("-", "/")
+    if "/" in s:
+        return s
+    for q in QUOTE_SUFFIXES:
+        if s.endswith(q) and len(s) > len(q):
+            return f"{s[: -len(q)]}/USD"
+    return f"{s}/USD"
 
-def load_csv(path: str):
+
+def iter_csv_ticks(path: str) -> Iterator[TickBatch]:
     """
     假設 csv 長這樣：
     timestamp,symbol,price,volume24h
     2025-10-31T10:00:00Z,BTCUSDT,67890,123456
     ...
+    rows must be grouped by timestamp in ascending order; volume24h is optional.
+    The file is streamed, one timestamp group at a time.
     """
     with open(path, newline="") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-    return rows
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        col = {name.strip(): i for i, name in enumerate(header)}
+        i_ts, i_sym, i_px = col["timestamp"], col["symbol"], col["price"]
+        i_vol = col.get("volume24h")
+
+        pair_cache: dict[str, str] = {}
+        cur_raw = None
+        cur_ms = None
+        ticks: list[tuple[str, float, float]] = []
+        for r in reader:
+            if not r:
+                continue
+            raw_ts = r[i_ts]
+            if raw_ts != cur_raw:
+                if ticks:
+                    yield cur_ms, ticks
+                    ticks = []
+                cur_raw = raw_ts
+                try:
+                    cur_ms = ts_to_epoch_ms(float(raw_ts))
+                except ValueError:
+                    cur_ms = ts_to_epoch_ms(raw_ts)
+            if cur_ms is None:
+                continue
+            sym = r[i_sym]
+            pair = pair_cache.get(sym)
+            if pair is None:
+                pair = pair_cache[sym] = _to_pair(sym)
+            try:
+                px = float(r[i_px])
+            except ValueError:
+                continue
+            vol = float(r[i_vol]) if i_vol is not None and r[i_vol] else float("inf")
+            ticks.append((pair, px, vol))
+        if ticks:
+            yield cur_ms, ticks
+
+
+def load_columns(path: str) -> dict:
+    # whole file as struct-of-arrays (ts, pair id, price, volume) for array-driven replays
+    ts: list[int] = []
+    pid: list[int] = []
+    px: list[float] = []
+    vol: list[float] = []
+    ids: dict[str, int] = {}
+    for ts_ms, ticks in iter_csv_ticks(path):
+        for pair, p, v in ticks:
+            i = ids.get(pair)
+            if i is None:
+                i = ids[pair] = len(ids)
+            ts.append(ts_ms)
+            pid.append(i)
+            px.append(p)
+            vol.append(v)
+    return {
+        "ts": np.asarray(ts, dtype=np.int64),
+        "pid": np.asarray(pid, dtype=np.int32),
+        "px": np.asarray(px, dtype=np.float64),
+        "vol": np.asarray(vol, dtype=np.float64),
+        "pairs": list(ids),
+    }
+
+
+def load_store_columns(store: PriceStore, interval: str, assets: list[str] | None = None,
+                       start_ms: int | None = None, end_ms: int | None = None) -> dict:
+    # same layout as load_columns, read from the memory-mapped local store (no network)
+    assets = assets or store.assets(interval)
+    ts_parts, pid_parts, px_parts, pairs = [], [], [], []
+    for asset in assets:
+        series = store.read(asset, interval, start_ms, end_ms)
+        if not series:
+            continue
+        ts_parts.append(series.ts)
+        px_parts.append(series.px)
+        pid_parts.append(np.full(len(series), len(pairs), dtype=np.int32))
+        pairs.append(f"{asset.upper()}/USD")
+    if not pairs:
+        return {"ts": np.empty(0, np.int64), "pid": np.empty(0, np.int32),
+                "px": np.empty(0, np.float64), "vol": np.empty(0, np.float64), "pairs": []}
+    ts = np.concatenate(ts_parts)
+    pid = np.concatenate(pid_parts)
+    order = np.lexsort((pid, ts))
+    return {
+        "ts": ts[order],
+        "pid": pid[order],
+        "px": np.concatenate(px_parts)[order],
+        "vol": np.full(len(ts), np.inf),
+        "pairs": pairs,
+    }
+
+
+def load_history(path: str | None = None, store_root: str | None = None, interval: str | None = None) -> dict:
+    if store_root:
+        return load_store_columns(PriceStore(store_root), interval or getattr(config, "HORUS_INTERVAL", "15m"))
+    return load_columns(path or config.BACKTEST_DATA_PATH)
 
 
-def run_backtest():
-    rows = load_csv(config.BACKTEST_DATA_PATH)
-    dh = DataHandler(lookback=config.LOOKBACK_MINUTES)
+class SimExchange:
+    # fills market orders at the last seen price; same surface as ExchangeClient for the engine
+    def __init__(self, cash: float, fee_rate: float = 0.001):
+        self.cash = float(cash)
+        self.fee_rate = float(fee_rate)
+        self.positions: dict[str, float] = defaultdict(float)
+        self.prices: dict[str, float] = {}
+        self.trades = 0
+        self.rejected = 0
+        self.fees = 0.0
+        self.clock_ms = 0
 
-    # 假設一開始全是 USDT
-    total_equity = config.TOTAL_CAPITAL_USDT
-    positions = defaultdict(float)
+    def create_order(self, pair: str, side: str, quantity: float, order_type: str = "MARKET"):
+        px = self.prices.get(pair)
+        qty = float(quantity)
+        side = side.upper()
+        if not px or qty <= 0:
+            self.rejected += 1
+            return {"Success": False, "ErrMsg": "no price"}
+        notional = qty * px
+        fee = notional * self.fee_rate
+        if side == "BUY":
+            if notional + fee > self.cash + 1e-9:
+                self.rejected += 1
+                return {"Success": False, "ErrMsg": "insufficient balance"}
+            self.cash -= notional + fee
+            self.positions[pair] += qty
+        else:
+            if qty > self.positions.get(pair, 0.0) + 1e-12:
+                self.rejected += 1
+                return {"Success": False, "ErrMsg": "insufficient position"}
+            self.cash += notional - fee
+            self.positions[pair] -= qty
+            if self.positions[pair] <= 1e-12:
+                del self.positions[pair]
+        self.trades += 1
+        self.fees += fee
+        return {
+            "Success": True,
+            "ErrMsg": "",
+            "OrderDetail": {
+                "Pair": pair, "Side": side, "Type": order_type.upper(), "Status": "FILLED",
+                "FilledQuantity": qty, "FilledAverPrice": px, "CommissionChargeValue": fee,
+                "FinishTimestamp": self.clock_ms,
+            },
+        }
 
-    equity_curve = []
+    def get_positions_and_equity(self, prices: dict[str, float]):
+        positions = {p: q for p, q in self.positions.items() if q > 0}
+        equity = self.cash + sum(q * prices.get(p, self.prices.get(p, 0.0)) for p, q in positions.items())
+        return positions, equity, self.cash
 
-    current_ts = None
-    current_tickers = []
 
-    for r in rows:
-        ts = r["timestamp"]
-        if (current_ts is not None) and (ts != current_ts):
-            # 到了下一分鐘，先跑一輪策略
-            dh.update_from_tickers(current_tickers)
+class BacktestEngine:
+    # replays ticks through the live stack: LiveDataHandler -> StrategyManager -> calc_rebalance_orders,
+    # with a simulated clock and exchange. Strategies are evaluated on eval_every_min bar boundaries.
+    def __init__(
+        self,
+        strategies: list[dict] | None = None,
+        initial_cash: float | None = None,
+        fee_rate: float | None = None,
+        eval_every_min: int | None = None,
+        min_notional: float | None = None,
+        maxlen: int = 1000,
+        rules: dict | None = None,
+    ):
+        self.clock = SimClock()
+        self.data_handler = LiveDataHandler(maxlen=maxlen, clock=self.clock)
+        self.strategy_manager = StrategyManager(allow_short=config.ALLOW_SHORT, specs=strategies, parallel=False,
+                                                shared=False)
+        self.strategy_manager.reset()
+        self.exchange = SimExchange(
+            cash=getattr(config, "BACKTEST_INITIAL_CASH", 50_000.0) if initial_cash is None else initial_cash,
+            fee_rate=getattr(config, "BACKTEST_FEE_RATE", 0.001) if fee_rate is None else fee_rate,
+        )
+        step_min = eval_every_min or getattr(config, "BACKTEST_EVAL_EVERY_MIN", 5)
+        self.step_ms = int(step_min) * 60_000
+        self.min_notional = getattr(config, "MIN_NOTIONAL", 0.1) if min_notional is None else min_notional
+        # same per-pair qty precision / MiniOrder sizing as live
+        self.rules = offline_rules() if rules is None else rules
 
-            momentum = dh.compute_momentum()
-            prices = dh.get_latest_price_map()
-            vols = dh.get_latest_volume24h_map()
+        self.prices: dict[str, float] = {}
+        self.liquidity: dict[str, float] = {}
+        self._pending: dict[str, tuple[list[int], list[float]]] = {}
+        self.equity_ts: list[int] = []
+        self.equity: list[float] = []
+        self.evals = 0
+        self.ticks = 0
 
-            target_weights = generate_target_weights(momentum, vols)
+    def _flush_pending(self) -> None:
+        for pair, (ts, px) in self._pending.items():
+            self.data_handler.append_arrays(pair, np.asarray(ts, dtype=np.int64), np.asarray(px, dtype=np.float64))
+        self._pending.clear()
 
-            orders = calc_rebalance_orders(
-                current_positions=positions,
-                prices=prices,
-                target_weights=target_weights,
-                total_equity=total_equity,
-                min_notional=1.0,
-            )
+    def step(self, ts_ms: int) -> None:
+        self._flush_pending()
+        self.clock.set(ts_ms)
+        self.exchange.clock_ms = ts_ms
+        self.exchange.prices = self.prices
+        self.evals += 1
 
-            # 模擬成交（市場單直接吃）
+        target_weights = self.strategy_manager.combine(
+            self.data_handler, self.prices, self.liquidity, clock=self.clock
+        )
+        positions, equity, _ = self.exchange.get_positions_and_equity(self.prices)
+        self.equity_ts.append(ts_ms)
+        self.equity.append(equity)
+        if not target_weights:
+            return
+
+        orders = calc_rebalance_orders(
+            current_positions=positions,
+            prices=self.prices,
+            target_weights=target_weights,
+            total_equity=equity,
+            min_notional=self.min_notional,
+            rules=self.rules,
+        )
+        for side in ("sell", "buy"):
             for o in orders:
-                sym = o["symbol"]
-                px = prices[sym]
-                if o["side"] == "buy":
-                    cost = o["qty"] * px
-                    total_equity -= cost
-                    positions[sym] += o["qty"]
-                else:
-                    gain = o["qty"] * px
-                    total_equity += gain
-                    positions[sym] -= o["qty"]
-
-            # 記錄當前市值
-            mkt_val = 0.0
-            for sym, qty in positions.items():
-                if sym in prices:
-                    mkt_val += qty * prices[sym]
-            equity = total_equity + mkt_val
-            equity_curve.append((current_ts, equity))
-
-            # reset
-            current_tickers = []
-
-        # 累積同一分鐘的 ticks
-        current_ts = ts
-        current_tickers.append({
-            "symbol": r["symbol"],
-            "price": r["price"],
-            "volume24h": r["volume24h"],
-        })
-
-    # 最後一段也跑一次
-    # ... 這裡你可以再補
-
-    # 輸出結果
-    for ts, eq in equity_curve[:20]:
-        print(ts, eq)
+                if o["side"] == side:
+                    self.exchange.create_order(o["symbol"], o["side"], o["qty"])
+
+    def run(self, batches: Iterable[TickBatch]) -> dict:
+        t0 = time.perf_counter()
+        next_eval = None
+        pending = self._pending
+        for ts_ms, ticks in batches:
+            if next_eval is not None and ts_ms >= next_eval:
+                self.step(next_eval)
+                next_eval = (ts_ms // self.step_ms + 1) * self.step_ms
+            elif next_eval is None:
+                next_eval = (ts_ms // self.step_ms + 1) * self.step_ms
+            for pair, px, vol in ticks:
+                buf = pending.get(pair)
+                if buf is None:
+                    buf = pending[pair] = ([], [])
+                buf[0].append(ts_ms)
+                buf[1].append(px)
+                self.prices[pair] = px
+                self.liquidity[pair] = vol
+            self.ticks += len(ticks)
+        if next_eval is not None:
+            self.step(next_eval)
+        return self.summary(time.perf_counter() - t0)
+
+    def run_columns(self, ts: np.ndarray, pid: np.ndarray, px: np.ndarray, vol: np.ndarray,
+                    pairs: list[str]) -> dict:
+        # same semantics as run(), driven from (possibly memory-mapped) arrays sorted by ts:
+        # every eval bar's rows are grouped by pair with one argsort and appended as slices
+        t0 = time.perf_counter()
+        if len(ts):
+            bars = ts // self.step_ms
+            cuts = np.flatnonzero(bars[1:] != bars[:-1]) + 1
+            starts = np.concatenate(([0], cuts))
+            ends = np.concatenate((cuts, [len(ts)]))
+            for a, b in zip(starts.tolist(), ends.tolist()):
+                self._ingest_columns(ts[a:b], pid[a:b], px[a:b], vol[a:b], pairs)
+                self.step((int(bars[a]) + 1) * self.step_ms)
+        return self.summary(time.perf_counter() - t0)
+
+    def _ingest_columns(self, ts, pid, px, vol, pairs) -> None:
+        order = np.argsort(pid, kind="stable")
+        spid = pid[order]
+        cuts = np.flatnonzero(spid[1:] != spid[:-1]) + 1
+        starts = np.concatenate(([0], cuts)).tolist()
+        ends = np.concatenate((cuts, [len(spid)])).tolist()
+        sts, spx, svol = ts[order], px[order], vol[order]
+        for a, b in zip(starts, ends):
+            pair = pairs[int(spid[a])]
+            self.data_handler.append_arrays(pair, sts[a:b], spx[a:b])
+            self.prices[pair] = float(spx[b - 1])
+            self.liquidity[pair] = float(svol[b - 1])
+        self.ticks += len(ts)
+
+    def summary(self, elapsed: float = 0.0) -> dict:
+        eq = np.asarray(self.equity, dtype=np.float64)
+        start = self.equity[0] if self.equity else self.exchange.cash
+        final = self.equity[-1] if self.equity else self.exchange.cash
+        if len(eq):
+            peak = np.maximum.accumulate(eq)
+            max_dd = float(np.max((peak - eq) / np.where(peak > 0, peak, 1.0)))
+        else:
+            max_dd = 0.0
+        return {
+            "start_equity": start,
+            "final_equity": final,
+            "pnl": final - start,
+            "return_pct": (final / start - 1.0) * 100.0 if start else 0.0,
+            "max_drawdown_pct": max_dd * 100.0,
+            "trades": self.exchange.trades,
+            "rejected": self.exchange.rejected,
+            "fees": self.exchange.fees,
+            "ticks": self.ticks,
+            "evals": self.evals,
+            "elapsed_sec": elapsed,
+        }
+
+
+def run_backtest(path: str | None = None, strategies: list[dict] | None = None, store_root: str | None = None,
+                 interval: str | None = None, **kwargs) -> dict:
+    engine = BacktestEngine(strategies=strategies, **kwargs)
+    if store_root:
+        cols = load_history(store_root=store_root, interval=interval)
+        return engine.run_columns(cols["ts"], cols["pid"], cols["px"], cols["vol"], cols["pairs"])
+    return engine.run(iter_csv_ticks(path or config.BACKTEST_DATA_PATH))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="replay a tick CSV through the live strategy stack "
+                                             "(run from the repo root: python -m backtest.backtest_runner)")
+    ap.add_argument("path", nargs="?", default=getattr(config, "BACKTEST_DATA_PATH", None))
+    ap.add_argument("--cash", type=float, default=None)
+    ap.add_argument("--fee", type=float, default=None)
+    ap.add_argument("--eval-every-min", type=int, default=None)
+    ap.add_argument("--store", default=None, help="replay from a local price store dir instead of a CSV")
+    ap.add_argument("--interval", default=None, help="store interval, default config.HORUS_INTERVAL")
+    args = ap.parse_args()
+
+    # the strategies log every gate decision at INFO; keep the replay quiet
+    logging.basicConfig(level=logging.WARNING)
+    res = run_backtest(args.path, store_root=args.store, interval=args.interval, initial_cash=args.cash,
+                       fee_rate=args.fee, eval_every_min=args.eval_every_min)
+    for k, v in res.items():
+        print(f"{k}: {v:.4f}" if isinstance(v, float) else f"{k}: {v}")
+
 
 if __name__ == "__main__":
-    run_backtest()
\ No newline at end of file
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import copy
+import csv
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import config
+from backtest.backtest_runner import BacktestEngine, load_history
+
+COLUMNS = ("ts", "pid", "px", "vol")
+
+# per-worker views over the shared history, opened once in _init_worker
+_shared: dict = {}
+
+
+def _parse_value(v: str):
+    try:
+        return json.loads(v)
+    except ValueError:
+        return v
+
+
+def parse_grid(items: list[str]) -> dict[str, list]:
+    # ["max_r_pct=0.004,0.006", "min_r_pct=0.002,0.003"] -> {"max_r_pct": [0.004, 0.006], ...}
+    grid: dict[str, list] = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if not name or not values:
+            raise ValueError(f"bad grid spec {item!r}, expected name=v1,v2,...")
+        grid[name.strip()] = [_parse_value(v.strip()) for v in values.split(",") if v.strip()]
+    return grid
+
+
+def expand_grid(grid: dict[str, list]) -> list[dict]:
+    if not grid:
+        return [{}]
+    names = list(grid)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(grid[n] for n in names))]
+
+
+def share_columns(cols: dict, directory: str) -> dict:
+    # dump once to .npy; workers memory-map the files so the page cache holds a single copy
+    paths = {}
+    for name in COLUMNS:
+        path = os.path.join(directory, f"{name}.npy")
+        np.save(path, cols[name])
+        paths[name] = path
+    with open(os.path.join(directory, "pairs.json"), "w", encoding="utf-8") as f:
+        json.dump(cols["pairs"], f)
+    paths["pairs"] = os.path.join(directory, "pairs.json")
+    return paths
+
+
+def _init_worker(paths: dict, log_level: int) -> None:
+    logging.basicConfig(level=log_level)
+    logging.getLogger().setLevel(log_level)
+    for name in COLUMNS:
+        _shared[name] = np.load(paths[name], mmap_mode="r")
+    with open(paths["pairs"], encoding="utf-8") as f:
+        _shared["pairs"] = json.load(f)
+
+
+def _run_one(strategy: dict, params: dict, engine_kwargs: dict) -> dict:
+    spec = copy.deepcopy(strategy)
+    spec.setdefault("params", {}).update(params)
+    engine = BacktestEngine(strategies=[spec], **engine_kwargs)
+    res = engine.run_columns(_shared["ts"], _shared["pid"], _shared["px"], _shared["vol"], _shared["pairs"])
+    res["params"] = params
+    return res
+
+
+def run_sweep(
+    data_path: str | None,
+    grid: dict[str, list],
+    strategy: dict | None = None,
+    max_workers: int | None = None,
+    engine_kwargs: dict | None = None,
+    store_root: str | None = None,
+    interval: str | None = None,
+) -> list[dict]:
+    strategy = strategy or getattr(config, "STRATEGIES", [])[0]
+    combos = expand_grid(grid)
+    engine_kwargs = engine_kwargs or {}
+    workers = max_workers or os.cpu_count() or 1
+
+    cols = load_history(data_path, store_root=store_root, interval=interval)
+    logging.info(f"[sweep] loaded ticks={len(cols['ts'])} pairs={len(cols['pairs'])} combos={len(combos)}")
+
+    tmpdir = tempfile.mkdtemp(prefix="sweep_")
+    results: list[dict] = []
+    try:
+        paths = share_columns(cols, tmpdir)
+        del cols
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(combos)),
+            initializer=_init_worker,
+            initargs=(paths, logging.WARNING),
+        ) as pool:
+            futures = [pool.submit(_run_one, strategy, p, engine_kwargs) for p in combos]
+            for fut in as_completed(futures):
+                try:
+                    results.append(fut.result())
+                except Exception:
+                    logging.exception("[sweep] backtest failed")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    results.sort(key=lambda r: r["pnl"], reverse=True)
+    return results
+
+
+def format_table(results: list[dict]) -> str:
+    lines = [f"{'rank':>4}  {'pnl':>12}  {'ret%':>8}  {'maxdd%':>8}  {'trades':>7}  params"]
+    for i, r in enumerate(results, 1):
+        params = ", ".join(f"{k}={v}" for k, v in r["params"].items())
+        lines.append(
+            f"{i:>4}  {r['pnl']:>12.2f}  {r['return_pct']:>8.2f}  {r['max_drawdown_pct']:>8.2f}  "
+            f"{r['trades']:>7d}  {params}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="grid-search strategy params over one tick file "
+                                             "(python -m backtest.sweep data.csv --grid max_r_pct=0.004,0.006)")
+    ap.add_argument("path", nargs="?", default=getattr(config, "BACKTEST_DATA_PATH", None))
+    ap.add_argument("--grid", action="append", default=[], help="name=v1,v2,... (repeatable)")
+    ap.add_argument("--strategy", default=None, help="name of the config.STRATEGIES entry to sweep")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", default=None, help="optional CSV of the ranked results")
+    ap.add_argument("--store", default=None, help="load history from a local price store dir instead of a CSV")
+    ap.add_argument("--interval", default=None)
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    strategy = None
+    if args.strategy:
+        strategy = next(s for s in config.STRATEGIES if s["name"] == args.strategy)
+    results = run_sweep(args.path, parse_grid(args.grid), strategy=strategy, max_workers=args.workers,
+                        store_root=args.store, interval=args.interval)
+    print(format_table(results))
+
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["rank", "pnl", "return_pct", "max_drawdown_pct", "trades", "fees", "params"])
+            for i, r in enumerate(results, 1):
+                w.writerow([i, f"{r['pnl']:.8f}", f"{r['return_pct']:.6f}", f"{r['max_drawdown_pct']:.6f}",
+                            r["trades"], f"{r['fees']:.8f}", json.dumps(r["params"])])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# clock.py
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+import time
+
+NY_TZ = ZoneInfo("America/New_York")
+
+
+class TickTime:
+    # one clock reading per tick, with the NY-session conversion done once for every consumer
+    __slots__ = ("utc", "ms", "ny")
+
+    def __init__(self, utc: datetime):
+        self.utc = utc
+        self.ms = int(utc.timestamp() * 1000)
+        self.ny = utc.astimezone(NY_TZ)
+
+    @property
+    def after_first4h_close(self) -> bool:
+        return self.ny.hour >= 4
+
+
+class SystemClock:
+    def now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def now_ms(self) -> int:
+        return int(time.time() * 1000)
+
+    def tick_time(self) -> TickTime:
+        return TickTime(self.now())
+
+
+class SimClock:
+    # driven explicitly by the backtester / replay feeds
+    def __init__(self, start_ms: int = 0):
+        self._ms = int(start_ms)
+
+    def set(self, ts_ms: int) -> None:
+        self._ms = int(ts_ms)
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self._ms / 1000.0, tz=timezone.utc)
+
+    def now_ms(self) -> int:
+        return self._ms
+
+    def tick_time(self) -> TickTime:
+        return TickTime(self.now())
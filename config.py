@@ -17,6 +17,29 @@ HORUS_START_PARAM = "start"
 HORUS_END_PARAM = "end"
 HORUS_INTERVAL_PARAM = "interval"
 
+HORUS_RATE_PER_SEC = 5.0         # shared token bucket across all Horus requests
+HORUS_RATE_BURST = 5
+HORUS_MAX_WORKERS = 8            # thread pool size for HorusClient.fetch_many
+HORUS_BACKFILL_OVERLAP_MIN = 30  # re-request this much before the last seen ts on incremental fetches
+HORUS_TIMEOUT_SEC = 10
+
+SNAPSHOT_FILE = "state/snapshot.bin"   # strategy + data handler state, rewritten atomically each cycle
+
+USE_PRICE_STORE = True           # write Horus bars to the local store and warm-start from it
+PRICE_STORE_DIR = "data/store"
+
+
+# pooled keep-alive sessions (http_pool.PooledHTTP) shared by HorusClient / ExchangeClient
+HTTP_POOL_SIZE = 10
+HTTP_MAX_RETRIES = 2             # GET only; orders are never retried by the adapter
+HTTP_BACKOFF_SEC = 0.3
+ROOSTOO_TIMEOUTS = {             # per-endpoint timeouts (sec)
+    "exchange_info": 10,
+    "ticker": 5,
+    "balance": 5,
+    "order": 5,
+}
+
 
 HORUS_TS_FIELDS = ["ts", "time", "timestamp", "t"]
 HORUS_PRICE_FIELDS = ["price", "p", "close", "c"]
@@ -24,33 +47,89 @@ HORUS_PRICE_FIELDS = ["price", "p", "close", "c"]
 
 ORDER_INTERVAL_SEC = 300          
 LOOP_INTERVAL_SEC = ORDER_INTERVAL_SEC   # time interval for main_loop calls
-
+SCHEDULER_OFFSET_SEC = 2.0               # fire this long after each bar boundary so the bar is published
+SCHEDULER_SESSION_TIMES_NY = ["04:00"]   # extra fire times (NY local), e.g. the first-4h close
+SCHEDULER_RUN_AT_START = True            # run one cycle immediately instead of waiting for the next boundary
+ASYNC_LOOP = False                       # poll mode on asyncio: balance overlaps the Horus pull
+
+# "poll": fetch + evaluate every LOOP_INTERVAL_SEC. "stream": ticks from STREAM_FEED build 5m bars
+# and strategies are evaluated on bar close
+INGEST_MODE = "poll"
+STREAM_FEED = "horus"            # horus (REST poll adapter) | websocket | replay (BACKTEST_DATA_PATH)
+STREAM_POLL_SEC = 60             # horus feed poll period
+STREAM_CLOSE_GRACE_SEC = 5       # wait this long after a bar period ends for late ticks / quiet pairs
+STREAM_WS_URL = os.getenv("STREAM_WS_URL", "")
+STREAM_WS_SUBSCRIBE = None       # optional JSON message sent after connecting
+STREAM_QUEUE_SIZE = 10_000
+STREAM_REPLAY_SPEED = None       # None = as fast as possible, else x realtime
+
+
+EMIT_SINK = "stdout"             # per-cycle price rows: none | stdout | file | store (only new bars are emitted)
+EMIT_FILE = "logs/prices.csv"
 
 LOG_FILE = "logs/run.log"
 LOG_LEVEL = "INFO"
 
+METRICS_ENABLED = True           # False: every metrics call is a no-op
+METRICS_FILE = "logs/metrics.prom"   # Prometheus text, rewritten every METRICS_DUMP_SEC (None = off)
+METRICS_DUMP_SEC = 60
+METRICS_PORT = None              # e.g. 9108 to serve http://127.0.0.1:9108/metrics
+
 
 TRADE_LOG_FILE = "logs/trades.csv"   
 EQUITY_LOG_FILE = "logs/equity.csv" 
+LOG_ROTATE_MAX_BYTES = 10_000_000    # trade/equity CSVs roll over at this size ...
+LOG_ROTATE_DAILY = True              # ... or at the UTC day change (old file -> name.YYYYMMDD.csv)
+LOG_FLUSH_SEC = 1.0
+LOG_QUEUE_SIZE = 10_000
+
+
+EXECUTION_CONCURRENT = True          # sells in parallel first, then buys in parallel
+EXECUTION_MAX_WORKERS = 4
+EXECUTION_BACKOFF_BASE_SEC = 0.25    # retry delay = uniform(0, min(max, base * 2**attempt))
+EXECUTION_BACKOFF_MAX_SEC = 2.0
 
 
 LOOKBACK_MINUTES = 240                       
 
 
-MIN_24H_VOLUME = 0               
+MIN_24H_VOLUME = 0               # USD, compared with the ticker UnitTradeValue
+TICKER_MAX_STALE_SEC = 900       # keep serving the last ticker snapshot this long if a refresh fails
+
+# dynamic universe: rank every Horus-supported USD pair by ticker 24h value (then spread) and fetch
+# history only for the top K. Off = the fixed main.UNIVERSE
+UNIVERSE_DYNAMIC = False
+UNIVERSE_TOP_K = 15
+UNIVERSE_REFRESH_SEC = 3600      # re-rank cadence; the per-cycle ticker pull is reused
+UNIVERSE_MIN_VOLUME = 0          # USD 24h value traded
+UNIVERSE_MAX_SPREAD = 0.005      # relative bid/ask spread
+UNIVERSE_PINNED = []             # always included, e.g. ["BTC/USD"]
 MAX_POSITION_PER_SYMBOL = 0.35   
 
 MIN_NOTIONAL = 10               
+EXCHANGE_INFO_TTL_SEC = 3600     # exchangeInfo (amount/price precision, MiniOrder) refresh period
+EXCHANGE_INFO_FILE = "data/exchange_info.json"   # last exchangeInfo, reused by backtest / sweep sizing
 
 ALLOW_SHORT = False
 STRICT_FIRST4H_ONLY = True       
 
+STRATEGY_PARALLEL = True         # evaluate strategies on a thread pool with per-strategy deadlines
+STRATEGY_TIMEOUT_SEC = 2.0       # default deadline; override per entry with "timeout_sec"
+STRATEGY_TIMEOUT_POLICY = "reuse"   # on timeout/error: "reuse" last good weights or "drop" the strategy
+STRATEGY_MAX_WORKERS = 0         # 0 = one worker per strategy
+
 DEBUG_LOG_WEIGHTS = True
 DEBUG_TOP_N = 5
 
 
 DRY_RUN = False   # For backtesting, True = simulation, False = real trading on roostoo
 
+BACKTEST_DATA_PATH = "data/ticks.csv"   # timestamp,symbol,price[,volume24h]
+BACKTEST_INITIAL_CASH = 50000.0
+BACKTEST_FEE_RATE = 0.001
+BACKTEST_EVAL_EVERY_MIN = 5             # strategies run on 5m bar boundaries, like live
+BACKTEST_AMOUNT_PRECISION = 4           # order qty decimals for pairs missing from EXCHANGE_INFO_FILE
+
 STRATEGIES = [
     {
         "name": "four_hr_range",
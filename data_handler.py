@@ -0,0 +1,384 @@
+# data_handler.py
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from clock import NY_TZ, SystemClock, TickTime
+from series import PriceSeries
+
+
+class SeriesBuffer:
+    # bounded (ts_ms, price) ring kept as contiguous numpy views; backing arrays are
+    # 2x maxlen so appends are amortised O(1) and only compact once per maxlen rows
+    __slots__ = ("maxlen", "ts", "px", "start", "end")
+
+    def __init__(self, maxlen: int):
+        self.maxlen = int(maxlen)
+        self.ts = np.empty(2 * self.maxlen, dtype=np.int64)
+        self.px = np.empty(2 * self.maxlen, dtype=np.float64)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def times(self) -> np.ndarray:
+        return self.ts[self.start:self.end]
+
+    def prices(self) -> np.ndarray:
+        return self.px[self.start:self.end]
+
+    def last(self) -> tuple[int, float] | None:
+        if self.end == self.start:
+            return None
+        return int(self.ts[self.end - 1]), float(self.px[self.end - 1])
+
+    def revise(self, ts: np.ndarray, px: np.ndarray) -> tuple[np.ndarray, np.ndarray] | None:
+        # overwrites the price of buffered rows whose ts appears in ts (sorted; the last duplicate
+        # wins); returns the (ts, px) rows that actually changed, None if nothing did
+        times = self.times()
+        if not len(ts) or not len(times):
+            return None
+        if len(ts) > 1:
+            keep = np.empty(len(ts), dtype=bool)
+            keep[:-1] = ts[1:] != ts[:-1]
+            keep[-1] = True
+            ts, px = ts[keep], px[keep]
+        idx = np.minimum(np.searchsorted(times, ts), len(times) - 1)
+        hit = times[idx] == ts
+        idx, px = idx[hit], px[hit]
+        changed = self.px[self.start + idx] != px
+        if not changed.any():
+            return None
+        idx, px = idx[changed], px[changed]
+        self.px[self.start + idx] = px
+        return times[idx].copy(), px
+
+    def copy(self) -> "SeriesBuffer":
+        out = SeriesBuffer.__new__(SeriesBuffer)
+        out.maxlen = self.maxlen
+        out.ts = self.ts.copy()
+        out.px = self.px.copy()
+        out.start, out.end = self.start, self.end
+        return out
+
+    def extend(self, ts: np.ndarray, px: np.ndarray) -> None:
+        n = len(ts)
+        if n == 0:
+            return
+        if n >= self.maxlen:
+            self.ts[: self.maxlen] = ts[-self.maxlen:]
+            self.px[: self.maxlen] = px[-self.maxlen:]
+            self.start, self.end = 0, self.maxlen
+            return
+        if self.end + n > len(self.ts):
+            keep = min(len(self), self.maxlen - n)
+            self.ts[:keep] = self.ts[self.end - keep: self.end]
+            self.px[:keep] = self.px[self.end - keep: self.end]
+            self.start, self.end = 0, keep
+        self.ts[self.end: self.end + n] = ts
+        self.px[self.end: self.end + n] = px
+        self.end += n
+        if len(self) > self.maxlen:
+            self.start = self.end - self.maxlen
+
+
+class _Session:
+    # first-4h (NY 00:00-04:00) high/low of the NY day containing the newest row; the in-window
+    # rows are kept as {ts: (high, low)} so a revised bar can be replaced, not just folded in
+    __slots__ = ("ny_date", "day_start_ms", "day_end_ms", "win_end_ms", "hi", "lo", "rows")
+
+    def __init__(self, ny_date, day_start_ms: int, day_end_ms: int, win_end_ms: int):
+        self.ny_date = ny_date
+        self.day_start_ms = day_start_ms
+        self.day_end_ms = day_end_ms
+        self.win_end_ms = win_end_ms
+        self.hi: float | None = None
+        self.lo: float | None = None
+        self.rows: dict[int, tuple[float, float]] = {}
+
+    def copy(self) -> "_Session":
+        out = _Session(self.ny_date, self.day_start_ms, self.day_end_ms, self.win_end_ms)
+        out.hi, out.lo = self.hi, self.lo
+        out.rows = dict(self.rows)
+        return out
+
+    def absorb(self, ts: np.ndarray, px: np.ndarray) -> None:
+        if not len(ts) or ts[-1] < self.day_start_ms or ts[0] >= self.win_end_ms:
+            return
+        mask = (ts >= self.day_start_ms) & (ts < self.win_end_ms)
+        if not mask.any():
+            return
+        sel = px[mask]
+        rows = self.rows
+        for t, p in zip(ts[mask].tolist(), sel.tolist()):
+            r = rows.get(t)
+            rows[t] = (p, p) if r is None else (max(r[0], p), min(r[1], p))
+        hi = float(sel.max())
+        lo = float(sel.min())
+        self.hi = hi if self.hi is None else max(self.hi, hi)
+        self.lo = lo if self.lo is None else min(self.lo, lo)
+
+    def revise(self, ts: np.ndarray, px: np.ndarray) -> bool:
+        # replaces stored rows and recomputes the range (an old value may have been the extreme);
+        # False when a row is unknown, e.g. a session restored from an older snapshot
+        ts, px = ts.tolist(), px.tolist()
+        if any(t not in self.rows for t in ts):
+            return False
+        for t, p in zip(ts, px):
+            self.rows[t] = (p, p)
+        self.hi = max(r[0] for r in self.rows.values())
+        self.lo = min(r[1] for r in self.rows.values())
+        return True
+
+    def reset(self) -> None:
+        self.hi = self.lo = None
+        self.rows = {}
+
+
+class _Bar:
+    __slots__ = ("start_ms", "open", "high", "low", "close")
+
+    def __init__(self, start_ms: int, px: float):
+        self.start_ms = start_ms
+        self.open = self.high = self.low = self.close = px
+
+    def update(self, px: float) -> None:
+        if px > self.high:
+            self.high = px
+        elif px < self.low:
+            self.low = px
+        self.close = px
+
+
+class LiveDataHandler:
+    def __init__(self, maxlen: int = 1000, clock=None, bar_ms: int = 5 * 60_000):
+        self.maxlen = maxlen
+        self.clock = clock or SystemClock()
+        self.tick: TickTime | None = None
+        self.buffers: dict[str, SeriesBuffer] = {}
+        self.ny = NY_TZ
+        self.sessions: dict[str, _Session] = {}
+
+        # streaming mode: ticks are folded into bar_ms bars; a bar's close is appended to the
+        # buffer when the first tick of the next bar arrives (or on flush_bars)
+        self.bar_ms = int(bar_ms)
+        self.streaming = False
+        self.bars: dict[str, _Bar] = {}
+        self._closed: set[str] = set()
+        self._closed_start_ms: int | None = None
+        self._last_closed: dict[str, int] = {}
+
+    def _buffer(self, pair: str) -> SeriesBuffer:
+        buf = self.buffers.get(pair)
+        if buf is None:
+            buf = self.buffers[pair] = SeriesBuffer(self.maxlen)
+        return buf
+
+    def update_series(self, pair: str, series: PriceSeries) -> None:
+        # the handler lives across cycles, so only rows at or after the last buffered ts are applied
+        if series:
+            self.append_arrays(pair, series.ts, series.px)
+
+    def series(self, pair: str) -> PriceSeries:
+        # read-only view over the buffered history (no copy)
+        buf = self.buffers.get(pair)
+        if buf is None:
+            return PriceSeries.empty()
+        return PriceSeries(buf.times(), buf.prices())
+
+    def append_arrays(self, pair: str, ts: np.ndarray, px: np.ndarray) -> None:
+        # ts must be sorted ascending epoch-ms; duplicates keep the last price
+        if not len(ts):
+            return
+        buf = self._buffer(pair)
+        last = buf.last()
+        revised = None
+        if last is not None and ts[0] <= last[0]:
+            # rows already buffered (e.g. the Horus re-fetch overlap) carry revised bars: replace
+            # those prices in place; rows between buffered timestamps cannot be inserted
+            old = ts <= last[0]
+            revised = buf.revise(ts[old], px[old])
+            ts, px = ts[~old], px[~old]
+        if len(ts) > 1 and not (ts[1:] > ts[:-1]).all():
+            keep = np.empty(len(ts), dtype=bool)
+            keep[:-1] = ts[1:] != ts[:-1]
+            keep[-1] = True
+            ts, px = ts[keep], px[keep]
+        buf.extend(ts, px)
+        if not len(buf):
+            return
+
+        sess = self._session_for(pair, int(buf.ts[buf.end - 1]))
+        if revised is not None:
+            rts, rpx = revised
+            inwin = (rts >= sess.day_start_ms) & (rts < sess.win_end_ms)
+            # a revised bar inside the window may have been the extreme, so the range is rebuilt
+            # from the session's rows, or from the buffer if it still holds the whole window
+            if inwin.any() and not sess.revise(rts[inwin], rpx[inwin]):
+                times = buf.times()
+                if times[0] <= sess.day_start_ms:
+                    sess.reset()
+                    sess.absorb(times, buf.prices())
+                else:
+                    sess.absorb(rts[inwin], rpx[inwin])
+        sess.absorb(ts, px)
+
+    def _session_for(self, pair: str, newest_ms: int) -> _Session:
+        sess = self.sessions.get(pair)
+        if sess is not None and sess.day_start_ms <= newest_ms < sess.day_end_ms:
+            return sess
+        ny_dt = datetime.fromtimestamp(newest_ms / 1000.0, tz=self.ny)
+        start_ny = datetime(ny_dt.year, ny_dt.month, ny_dt.day, 0, 0, tzinfo=self.ny)
+        next_day = start_ny.date() + timedelta(days=1)
+        end_day_ny = datetime(next_day.year, next_day.month, next_day.day, 0, 0, tzinfo=self.ny)
+        win_end_ny = start_ny + timedelta(hours=4)
+        sess = _Session(
+            start_ny.date(),
+            int(start_ny.timestamp() * 1000),
+            int(end_day_ny.timestamp() * 1000),
+            int(win_end_ny.timestamp() * 1000),
+        )
+        # rows of the new day already in the buffer (e.g. after a restore) seed the range
+        buf = self.buffers.get(pair)
+        if buf is not None and len(buf):
+            sess.absorb(buf.times(), buf.prices())
+        self.sessions[pair] = sess
+        return sess
+
+    def on_tick(self, pair: str, ts_ms: int, px: float) -> bool:
+        # returns True if this tick closed the pair's previous bar
+        self.streaming = True
+        start = ts_ms - ts_ms % self.bar_ms
+        bar = self.bars.get(pair)
+        if bar is None:
+            last = self.buffers.get(pair)
+            if last is not None and len(last) and start < last.last()[0]:
+                return False
+            if start <= self._last_closed.get(pair, -1):
+                # period already closed (flushed by the clock); a late tick must not reopen it
+                return False
+            self.bars[pair] = _Bar(start, px)
+            return False
+        if start == bar.start_ms:
+            bar.update(px)
+            return False
+        if start < bar.start_ms:
+            return False
+        self._close_bar(pair, bar)
+        self.bars[pair] = _Bar(start, px)
+        return True
+
+    def flush_bars(self, now_ms: int) -> int:
+        # closes bars whose period has ended but that never saw a next tick (quiet pairs)
+        n = 0
+        for pair, bar in list(self.bars.items()):
+            if bar.start_ms + self.bar_ms <= now_ms:
+                self._close_bar(pair, bar)
+                del self.bars[pair]
+                n += 1
+        return n
+
+    def _close_bar(self, pair: str, bar: _Bar) -> None:
+        self.append_arrays(pair, np.array([bar.start_ms], dtype=np.int64), np.array([bar.close]))
+        sess = self.sessions.get(pair)
+        if sess is not None:
+            sess.absorb(np.array([bar.start_ms, bar.start_ms], dtype=np.int64), np.array([bar.high, bar.low]))
+        self._closed.add(pair)
+        self._last_closed[pair] = bar.start_ms
+        if self._closed_start_ms is None or bar.start_ms > self._closed_start_ms:
+            self._closed_start_ms = bar.start_ms
+
+    def closed_bars(self) -> set[str]:
+        return self._closed
+
+    def bars_ready(self, now_ms: int, grace_ms: int = 0) -> bool:
+        # a closed period is evaluated once every pair that traded in it has rolled over, or
+        # grace_ms after the period ended; quiet pairs are closed by the clock at that point
+        self.flush_bars(now_ms - grace_ms)
+        if not self._closed:
+            return False
+        if now_ms >= self._closed_start_ms + self.bar_ms + grace_ms:
+            return True
+        return all(b.start_ms > self._closed_start_ms for b in self.bars.values())
+
+    def closed_is_live(self, now_ms: int, grace_ms: int = 0) -> bool:
+        # False when the pending close is older than the current bar period, i.e. it came from
+        # backfilled history (a cold poll yields the whole lookback) rather than real time
+        if self._closed_start_ms is None:
+            return False
+        return self._closed_start_ms + self.bar_ms + grace_ms >= now_ms - self.bar_ms
+
+    def clear_closed(self) -> None:
+        self._closed.clear()
+        self._closed_start_ms = None
+
+    def snapshot(self) -> "LiveDataHandler":
+        # detached copy for readers on other threads (strategy workers); later appends to this
+        # handler never show through, even if a slow reader outlives the cycle
+        snap = LiveDataHandler.__new__(LiveDataHandler)
+        snap.__dict__.update(self.__dict__)
+        snap.buffers = {p: buf.copy() for p, buf in self.buffers.items()}
+        snap.sessions = {p: sess.copy() for p, sess in self.sessions.items()}
+        snap.bars = {}
+        snap._closed = set(self._closed)
+        return snap
+
+    def get_state(self) -> dict:
+        return {
+            "maxlen": self.maxlen,
+            "buffers": {p: (buf.times().copy(), buf.prices().copy()) for p, buf in self.buffers.items()},
+            "sessions": {
+                p: (s.ny_date, s.day_start_ms, s.day_end_ms, s.win_end_ms, s.hi, s.lo, s.rows)
+                for p, s in self.sessions.items()
+            },
+        }
+
+    def set_state(self, state: dict) -> None:
+        self.buffers.clear()
+        self.sessions.clear()
+        for pair, (ts, px) in state.get("buffers", {}).items():
+            buf = self._buffer(pair)
+            buf.extend(np.asarray(ts, dtype=np.int64), np.asarray(px, dtype=np.float64))
+        for pair, (ny_date, day_start, day_end, win_end, hi, lo, *rows) in state.get("sessions", {}).items():
+            # older snapshots have no rows; revisions then fall back to the buffer
+            sess = _Session(ny_date, day_start, day_end, win_end)
+            sess.hi, sess.lo = hi, lo
+            sess.rows = {int(t): tuple(r) for t, r in (rows[0] if rows else {}).items()}
+            self.sessions[pair] = sess
+
+    def begin_tick(self, tick: TickTime | None = None) -> TickTime:
+        # pins "now" for the rest of the cycle so per-pair gates don't re-read the clock
+        self.tick = tick or self.clock.tick_time()
+        return self.tick
+
+    def is_after_first4h_close(self) -> bool:
+        if self.tick is not None:
+            return self.tick.after_first4h_close
+        return self.clock.tick_time().after_first4h_close
+
+    def get_first4h_range(self, pair: str):
+        sess = self.sessions.get(pair)
+        if sess is None:
+            return None, None, None
+        if sess.hi is not None and sess.lo is not None:
+            return sess.hi, sess.lo, str(sess.ny_date)
+        return None, None, str(sess.ny_date)
+
+    def first4h_ready(self, pair: str) -> bool:
+        hi, lo, _ = self.get_first4h_range(pair)
+        return hi is not None and lo is not None
+
+    def is_5m_bar_close(self, pair: str) -> bool:
+        # polling mode has no bar boundaries; every cycle counts as a close
+        if not self.streaming:
+            return True
+        return pair in self._closed
+
+    def get_5m_close(self, pair: str):
+        buf = self.buffers.get(pair)
+        if not buf:
+            return None
+        return buf.last()[1]
@@ -2,9 +2,9 @@
 import time
 import hmac
 import hashlib
-import requests
 import logging
 import config
+from http_pool import PooledHTTP
 
 
 def _now_ms() -> str:
@@ -35,24 +35,35 @@ def _sign_payload(payload: dict) -> tuple[dict, dict, str]:
 class ExchangeClient:
     def __init__(self):
         self.base_url = config.BASE_URL.rstrip("/")
+        self.http = PooledHTTP(
+            "roostoo",
+            timeouts=getattr(config, "ROOSTOO_TIMEOUTS", None),
+            default_timeout=5.0,
+        )
+
+    def http_stats(self) -> dict:
+        return self.http.stats()
+
+    def close(self) -> None:
+        self.http.close()
 
     def get_exchange_info(self):
         url = f"{self.base_url}/v3/exchangeInfo"
-        resp = requests.get(url, timeout=5)
+        resp = self.http.get(url, endpoint="exchange_info")
         resp.raise_for_status()
         return resp.json()
 
     def get_all_tickers(self):
         url = f"{self.base_url}/v3/ticker"
         params = {"timestamp": _now_ms()}
-        resp = requests.get(url, params=params, timeout=5)
+        resp = self.http.get(url, endpoint="ticker", params=params)
         resp.raise_for_status()
         return resp.json()
 
     def get_balance_raw(self):
         url = f"{self.base_url}/v3/balance"
         headers, payload, _ = _sign_payload({})
-        resp = requests.get(url, headers=headers, params=payload, timeout=5)
+        resp = self.http.get(url, endpoint="balance", headers=headers, params=payload)
         resp.raise_for_status()
         return resp.json()
 
@@ -65,14 +76,16 @@ class ExchangeClient:
             "type": order_type.upper(),
         }
         headers, payload_with_ts, _ = _sign_payload(payload)
-        resp = requests.post(url, headers=headers, data=payload_with_ts, timeout=5)
+        resp = self.http.post(url, endpoint="order", headers=headers, data=payload_with_ts)
         resp.raise_for_status()
         return resp.json()
 
     
     def get_positions_and_equity(self, prices: dict[str, float]):
+        return self.positions_from_balance(self.get_balance_raw(), prices)
 
-        bal = self.get_balance_raw()
+    def positions_from_balance(self, bal: dict, prices: dict[str, float]):
+        # split from the request so the balance can be fetched while prices are still loading
         logging.info("[exchange] raw balance response: %s", bal)
 
         if not bal.get("Success"):
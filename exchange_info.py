@@ -0,0 +1,151 @@
+# exchange_info.py
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+import config
+
+
+class PairRules:
+    # per-pair trading constraints from Roostoo /v3/exchangeInfo TradePairs
+    __slots__ = ("pair", "amount_precision", "price_precision", "min_order", "can_trade")
+
+    def __init__(self, pair: str, amount_precision: int = 0, price_precision: int = 2,
+                 min_order: float = 0.0, can_trade: bool = True):
+        self.pair = pair
+        self.amount_precision = int(amount_precision)
+        self.price_precision = int(price_precision)
+        self.min_order = float(min_order)       # minimum order value in the quote currency
+        self.can_trade = bool(can_trade)
+
+    @classmethod
+    def from_info(cls, pair: str, info: dict) -> "PairRules":
+        return cls(
+            pair,
+            amount_precision=info.get("AmountPrecision", 0),
+            price_precision=info.get("PricePrecision", 2),
+            min_order=info.get("MiniOrder", 0.0),
+            can_trade=info.get("CanTrade", True),
+        )
+
+    def floor_qty(self, qty: float) -> float:
+        # round down to the amount step; the small epsilon keeps 0.3 from becoming 0.29999
+        step = 10 ** self.amount_precision
+        return round(math.floor(qty * step + 1e-9) / step, self.amount_precision)
+
+    def __repr__(self) -> str:
+        return (f"PairRules({self.pair}, amount_dp={self.amount_precision}, price_dp={self.price_precision}, "
+                f"min_order={self.min_order}, can_trade={self.can_trade})")
+
+
+def parse_exchange_info(raw: dict) -> dict[str, PairRules]:
+    pairs = (raw or {}).get("TradePairs") or {}
+    return {pair: PairRules.from_info(pair, info or {}) for pair, info in pairs.items()}
+
+
+def save_exchange_info(path: str, raw: dict) -> None:
+    # atomic, so a reader never sees half a file
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(raw, f)
+    os.replace(tmp, path)
+
+
+class StaticRules(dict):
+    # offline rules (backtest, sweep, replay): the last exchangeInfo saved by a live run, and a
+    # default precision for pairs it does not cover, so sizing matches the live path
+    def __init__(self, rules: dict[str, PairRules] | None = None, amount_precision: int = 4,
+                 min_order: float = 0.0):
+        super().__init__(rules or {})
+        self.amount_precision = int(amount_precision)
+        self.min_order = float(min_order)
+
+    def get(self, pair: str, default=None) -> PairRules:
+        rule = super().get(pair)
+        if rule is None:
+            rule = self[pair] = PairRules(pair, amount_precision=self.amount_precision, min_order=self.min_order)
+        return rule
+
+
+def offline_rules(path: str | None = None) -> StaticRules:
+    path = path or getattr(config, "EXCHANGE_INFO_FILE", None)
+    rules = {}
+    if path and os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                rules = parse_exchange_info(json.load(f))
+        except (OSError, ValueError) as e:
+            logging.warning(f"[exchange_info] cannot read {path}: {e}")
+    return StaticRules(rules, amount_precision=getattr(config, "BACKTEST_AMOUNT_PRECISION", 4))
+
+
+class ExchangeInfoCache:
+    # fetched once at start, then refreshed in the background every ttl_sec. Readers always get
+    # the last good snapshot without waiting on the network; a failed refresh keeps the old one.
+    def __init__(self, exchange_client, ttl_sec: float | None = None):
+        self.client = exchange_client
+        self.ttl_sec = float(ttl_sec or getattr(config, "EXCHANGE_INFO_TTL_SEC", 3600))
+        self._rules: dict[str, PairRules] = {}
+        self._fetched_at: float | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def refresh(self) -> bool:
+        try:
+            raw = self.client.get_exchange_info()
+            rules = parse_exchange_info(raw)
+        except Exception as e:
+            logging.warning(f"[exchange_info] refresh failed: {e}")
+            return False
+        if not rules:
+            logging.warning("[exchange_info] empty TradePairs, keeping previous rules")
+            return False
+        with self._lock:
+            self._rules = rules
+            self._fetched_at = time.monotonic()
+        logging.info(f"[exchange_info] loaded rules for {len(rules)} pairs")
+        path = getattr(config, "EXCHANGE_INFO_FILE", None)
+        if path:
+            # kept on disk for offline sizing (offline_rules)
+            try:
+                save_exchange_info(path, raw)
+            except OSError as e:
+                logging.warning(f"[exchange_info] cannot save {path}: {e}")
+        return True
+
+    def start(self) -> "ExchangeInfoCache":
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="exchange-info", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while True:
+            # retry sooner while we have nothing cached
+            wait = self.ttl_sec if self._fetched_at is not None else min(self.ttl_sec, 30.0)
+            if self._stop.wait(wait):
+                return
+            self.refresh()
+
+    def stale(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl_sec
+
+    def rules(self) -> dict[str, PairRules]:
+        if self._thread is None and self.stale():
+            self.refresh()
+        with self._lock:
+            return self._rules
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -1,47 +1,159 @@
+import asyncio
 import logging
+import random
 import time
-import os
-import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 import config
+import metrics
+from log_writer import get_writer
 
 TRADE_LOG_FILE = getattr(config, "TRADE_LOG_FILE", "logs/trades.csv")
 
 
-def _append_trade_log(order: dict, resp: dict):
+TRADE_LOG_HEADER = [
+    "ts", "symbol", "side", "qty", "order_id", "status", "filled_qty", "fill_price",
+    "commission", "commission_coin", "attempts", "latency_ms", "error",
+]
 
+
+def _trade_row(fill: dict) -> list:
+    order = fill["order"]
+    resp = fill["resp"] if isinstance(fill["resp"], dict) else {}
+    detail = resp.get("OrderDetail") or {}
+    return [
+        fill["ts"],
+        order.get("symbol"),
+        order.get("side"),
+        order.get("qty"),
+        detail.get("OrderID", ""),
+        detail.get("Status", "") or ("" if fill["ok"] else "FAILED"),
+        detail.get("FilledQuantity", ""),
+        detail.get("FilledAverPrice", ""),
+        detail.get("CommissionChargeValue", ""),
+        detail.get("CommissionCoin", ""),
+        fill.get("attempts", ""),
+        f"{fill.get('latency_ms', 0.0):.1f}",
+        fill.get("error") or resp.get("ErrMsg") or "",
+    ]
+
+
+def _append_trade_logs(fills: list[dict]):
+    # every submission, failed ones included (attempts / error say why); queued to the
+    # background writer, so placement never waits on disk
+    if not fills or not TRADE_LOG_FILE:
+        return
     try:
-        os.makedirs(os.path.dirname(TRADE_LOG_FILE), exist_ok=True)
-        file_exists = os.path.exists(TRADE_LOG_FILE)
-        with open(TRADE_LOG_FILE, "a", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            if not file_exists:
-                w.writerow(["ts", "symbol", "side", "qty", "resp"])
-            w.writerow([
-                datetime.now(timezone.utc).isoformat(),
-                order.get("symbol"),
-                order.get("side"),
-                order.get("qty"),
-                repr(resp),
-            ])
+        writer = get_writer()
+        writer.register(TRADE_LOG_FILE, TRADE_LOG_HEADER)
+        for fill in fills:
+            writer.write(TRADE_LOG_FILE, _trade_row(fill))
     except Exception as e:
         logging.error(f"failed to append trade log: {e}")
 
 
-def execute_orders(exchange_client, orders: list[dict], retry: int = 1):
-    for o in orders:
-        for attempt in range(retry + 1):
-            try:
-                resp = exchange_client.create_order(
-                    pair=o["symbol"],
-                    side=o["side"],
-                    quantity=o["qty"],
-                    order_type="MARKET"
-                )
-                logging.info(f"ORDER OK: {o} -> {resp}")
-                _append_trade_log(o, resp)
-                break
-            except Exception as e:
-                logging.error(f"ORDER FAIL (try {attempt+1}): {o} -> {e}")
-                time.sleep(1)
+def _backoff_delay(attempt: int) -> float:
+    # exponential backoff with full jitter
+    base = float(getattr(config, "EXECUTION_BACKOFF_BASE_SEC", 0.25))
+    cap = float(getattr(config, "EXECUTION_BACKOFF_MAX_SEC", 2.0))
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _submit_order(exchange_client, o: dict, retry: int) -> dict:
+    t0 = time.perf_counter()
+    result = {"order": o, "ok": False, "resp": None, "error": None, "attempts": 0, "latency_ms": 0.0, "ts": None}
+    for attempt in range(retry + 1):
+        result["attempts"] = attempt + 1
+        try:
+            resp = exchange_client.create_order(
+                pair=o["symbol"],
+                side=o["side"],
+                quantity=o["qty"],
+                order_type="MARKET"
+            )
+            result["ok"] = True
+            result["resp"] = resp
+            result["error"] = None
+            break
+        except Exception as e:
+            result["error"] = str(e)
+            logging.error(f"ORDER FAIL (try {attempt+1}): {o} -> {e}")
+            if attempt < retry:
+                time.sleep(_backoff_delay(attempt))
+    result["latency_ms"] = (time.perf_counter() - t0) * 1000.0
+    metrics.observe("order_ms", result["latency_ms"], side=o.get("side"))
+    metrics.inc("orders_total", side=o.get("side"), ok=result["ok"])
+    result["ts"] = datetime.now(timezone.utc).isoformat()
+    if result["ok"]:
+        logging.info(f"ORDER OK: {o} -> {result['resp']} latency_ms={result['latency_ms']:.1f}")
+    return result
+
+
+def _run_batch(exchange_client, batch: list[dict], retry: int, max_workers: int) -> list[dict]:
+    if not batch:
+        return []
+    if max_workers <= 1 or len(batch) == 1:
+        return [_submit_order(exchange_client, o, retry) for o in batch]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batch)), thread_name_prefix="order") as pool:
+        return list(pool.map(lambda o: _submit_order(exchange_client, o, retry), batch))
+
+
+def execute_orders(exchange_client, orders: list[dict], retry: int = 1,
+                   concurrent: bool | None = None, max_workers: int | None = None,
+                   trade_log: bool = True) -> list[dict]:
+    if concurrent is None:
+        concurrent = bool(getattr(config, "EXECUTION_CONCURRENT", True))
+    if max_workers is None:
+        max_workers = int(getattr(config, "EXECUTION_MAX_WORKERS", 4))
+    if not concurrent:
+        max_workers = 1
+
+    results: list[dict] = []
+    for batch in _split_sides(orders):
+        batch_results = _run_batch(exchange_client, batch, retry, max_workers)
+        if trade_log:
+            _append_trade_logs(batch_results)
+        results.extend(batch_results)
+    _log_summary(results)
+    return results
+
+
+async def execute_orders_async(exchange_client, orders: list[dict], retry: int = 1,
+                               max_workers: int | None = None) -> list[dict]:
+    # same sell-then-buy ordering as execute_orders; each order runs on a worker thread via the
+    # sync client, bounded by a semaphore instead of a per-call pool
+    if max_workers is None:
+        max_workers = int(getattr(config, "EXECUTION_MAX_WORKERS", 4))
+    sem = asyncio.Semaphore(max(1, max_workers))
+
+    async def submit(o: dict) -> dict:
+        async with sem:
+            return await asyncio.to_thread(_submit_order, exchange_client, o, retry)
+
+    results: list[dict] = []
+    for batch in _split_sides(orders):
+        if not batch:
+            continue
+        batch_results = list(await asyncio.gather(*(submit(o) for o in batch)))
+        _append_trade_logs(batch_results)
+        results.extend(batch_results)
+    _log_summary(results)
+    return results
+
+
+def _split_sides(orders: list[dict]) -> tuple[list[dict], list[dict]]:
+    # sells go out first so the cash they free is available to the buys
+    sells = [o for o in orders if str(o.get("side", "")).lower() == "sell"]
+    buys = [o for o in orders if str(o.get("side", "")).lower() != "sell"]
+    return sells, buys
+
+
+def _log_summary(results: list[dict]) -> None:
+    if results:
+        lat = sorted(r["latency_ms"] for r in results)
+        failed = sum(1 for r in results if not r["ok"])
+        logging.info(
+            f"[execution] sent={len(results)} failed={failed} "
+            f"latency_ms p50={lat[len(lat) // 2]:.1f} max={lat[-1]:.1f}"
+        )
@@ -0,0 +1,253 @@
+# feeds.py
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from datetime import timedelta
+from typing import Iterator
+
+import config
+from horus_client import FALLBACK_PX_KEYS, FALLBACK_TS_KEYS, ts_to_epoch_ms
+
+# (pair, ts_ms, price); feeds yield None as an idle heartbeat so the consumer can still close
+# bars on the clock when nothing trades
+Tick = tuple[str, int, float]
+
+
+class PriceFeed:
+    def ticks(self) -> Iterator[Tick | None]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class ReplayFeed(PriceFeed):
+    # replays recorded history (tick CSV or local price store) in ts order, driving a SimClock.
+    # speed=None replays as fast as possible, otherwise sleeps (ts delta / speed) between ticks.
+    def __init__(self, batches, clock=None, pairs: list[str] | None = None, speed: float | None = None):
+        self.batches = batches
+        self.clock = clock
+        self.pairs = set(pairs) if pairs else None
+        self.speed = speed
+        self._closed = False
+
+    @classmethod
+    def from_csv(cls, path: str, **kw) -> "ReplayFeed":
+        from backtest.backtest_runner import iter_csv_ticks
+        return cls(iter_csv_ticks(path), **kw)
+
+    @classmethod
+    def from_store(cls, store, interval: str, assets: list[str] | None = None,
+                   start_ms: int | None = None, end_ms: int | None = None, **kw) -> "ReplayFeed":
+        from backtest.backtest_runner import load_store_columns
+        cols = load_store_columns(store, interval, assets, start_ms, end_ms)
+        return cls(_column_batches(cols), **kw)
+
+    def ticks(self) -> Iterator[Tick | None]:
+        prev = None
+        for ts_ms, batch in self.batches:
+            if self._closed:
+                return
+            if self.speed and prev is not None and ts_ms > prev:
+                time.sleep((ts_ms - prev) / 1000.0 / self.speed)
+            prev = ts_ms
+            if self.clock is not None:
+                self.clock.set(ts_ms)
+            for pair, px, _vol in batch:
+                if self.pairs is None or pair in self.pairs:
+                    yield pair, ts_ms, px
+
+    def close(self) -> None:
+        self._closed = True
+
+
+def _column_batches(cols: dict):
+    ts, pid, px, pairs = cols["ts"], cols["pid"], cols["px"], cols["pairs"]
+    if not len(ts):
+        return
+    ts_l, pid_l, px_l = ts.tolist(), pid.tolist(), px.tolist()
+    cur, batch = ts_l[0], []
+    for t, i, p in zip(ts_l, pid_l, px_l):
+        if t != cur:
+            yield cur, batch
+            cur, batch = t, []
+        batch.append((pairs[i], p, float("inf")))
+    yield cur, batch
+
+
+class HorusPollingFeed(PriceFeed):
+    # adapts the incremental Horus REST poll to the feed interface: each poll yields only the
+    # rows newer than what was already emitted, with heartbeats in between
+    def __init__(self, client, pairs: list[str], clock, poll_sec: float | None = None,
+                 heartbeat_sec: float = 1.0, lookback_hours: float | None = None):
+        self.client = client
+        self.pairs = list(pairs)
+        self.clock = clock
+        self.poll_sec = poll_sec or getattr(config, "STREAM_POLL_SEC", 60)
+        self.heartbeat_sec = heartbeat_sec
+        self.lookback = timedelta(hours=getattr(config, "LOOKBACK_HOURS", 24) if lookback_hours is None
+                                  else lookback_hours)
+        self._last: dict[str, int] = {}
+        self._stop = threading.Event()
+
+    def ticks(self) -> Iterator[Tick | None]:
+        while not self._stop.is_set():
+            t0 = time.monotonic()
+            try:
+                results, errors = self.client.fetch_incremental(self.pairs, self.lookback, self.clock.now())
+            except Exception:
+                logging.exception("[feed] horus poll failed")
+                results, errors = {}, {}
+            for pair, err in errors.items():
+                logging.warning(f"[feed] horus fetch failed for {pair}: {err}")
+            for pair, series in results.items():
+                last = self._last.get(pair)
+                new = series if last is None else series.after(last)
+                if not new:
+                    continue
+                self._last[pair] = new.last_ts
+                for ts_ms, px in zip(new.ts.tolist(), new.px.tolist()):
+                    yield pair, ts_ms, px
+            while not self._stop.is_set():
+                left = self.poll_sec - (time.monotonic() - t0)
+                if left <= 0:
+                    break
+                self._stop.wait(min(left, self.heartbeat_sec))
+                yield None
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+class WebSocketFeed(PriceFeed):
+    # generic JSON-over-websocket price stream. A reader thread pushes parsed ticks onto a queue
+    # and reconnects with jittered backoff; ticks() drains it and heartbeats when idle.
+    # Messages are objects (or lists of objects) carrying a pair/symbol/asset key plus one of the
+    # configured timestamp and price keys. Needs the optional websocket-client package.
+    def __init__(self, url: str | None = None, pairs: list[str] | None = None,
+                 subscribe: dict | None = None, heartbeat_sec: float = 1.0):
+        try:
+            import websocket  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("WebSocketFeed needs the websocket-client package") from e
+        self.url = url or getattr(config, "STREAM_WS_URL", None)
+        if not self.url:
+            raise ValueError("no websocket url (config.STREAM_WS_URL)")
+        self.pairs = set(pairs) if pairs else None
+        self.subscribe = subscribe if subscribe is not None else getattr(config, "STREAM_WS_SUBSCRIBE", None)
+        self.heartbeat_sec = heartbeat_sec
+        self.ts_keys = list(dict.fromkeys(getattr(config, "HORUS_TS_FIELDS", []) + FALLBACK_TS_KEYS))
+        self.px_keys = list(dict.fromkeys(getattr(config, "HORUS_PRICE_FIELDS", []) + FALLBACK_PX_KEYS))
+        self._q: queue.Queue = queue.Queue(maxsize=getattr(config, "STREAM_QUEUE_SIZE", 10_000))
+        self._stop = threading.Event()
+        self._ws = None
+        self._thread: threading.Thread | None = None
+        self.dropped = 0
+
+    def _pair_of(self, msg: dict) -> str | None:
+        for k in ("pair", "symbol", "asset"):
+            v = msg.get(k)
+            if v:
+                v = str(v).upper().replace("-", "/")
+                return v if "/" in v else f"{v}/USD"
+        return None
+
+    def _parse(self, raw: str) -> list[Tick]:
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return []
+        out: list[Tick] = []
+        for msg in data if isinstance(data, list) else [data]:
+            if not isinstance(msg, dict):
+                continue
+            pair = self._pair_of(msg)
+            if pair is None or (self.pairs is not None and pair not in self.pairs):
+                continue
+            ts_val = next((msg[k] for k in self.ts_keys if k in msg), None)
+            px_val = next((msg[k] for k in self.px_keys if k in msg), None)
+            ts_ms = ts_to_epoch_ms(ts_val) if ts_val is not None else int(time.time() * 1000)
+            try:
+                px = float(px_val)
+            except (TypeError, ValueError):
+                continue
+            if ts_ms is not None:
+                out.append((pair, ts_ms, px))
+        return out
+
+    def _run(self) -> None:
+        import websocket
+
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                self._ws = websocket.create_connection(self.url, timeout=self.heartbeat_sec * 10)
+                if self.subscribe:
+                    self._ws.send(json.dumps(self.subscribe))
+                logging.info(f"[feed] websocket connected {self.url}")
+                attempt = 0
+                while not self._stop.is_set():
+                    try:
+                        raw = self._ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        continue
+                    for tick in self._parse(raw):
+                        try:
+                            self._q.put_nowait(tick)
+                        except queue.Full:
+                            self.dropped += 1
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                attempt += 1
+                delay = random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+                logging.warning(f"[feed] websocket error: {e}; reconnecting in {delay:.1f}s")
+                self._stop.wait(delay)
+            finally:
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+
+    def ticks(self) -> Iterator[Tick | None]:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ws-feed", daemon=True)
+            self._thread.start()
+        while not self._stop.is_set():
+            try:
+                yield self._q.get(timeout=self.heartbeat_sec)
+            except queue.Empty:
+                yield None
+
+    def close(self) -> None:
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+def make_feed(kind: str, engine) -> PriceFeed:
+    pairs = [p for p, _ in engine.universe]
+    if kind == "horus":
+        needs = getattr(engine, "needs", None)
+        return HorusPollingFeed(engine.horus_client, pairs, engine.clock,
+                                lookback_hours=needs.lookback_hours if needs is not None else None)
+    if kind == "websocket":
+        return WebSocketFeed(pairs=pairs)
+    if kind == "replay":
+        return ReplayFeed.from_csv(getattr(config, "BACKTEST_DATA_PATH", "data/ticks.csv"),
+                                   clock=engine.clock, pairs=pairs,
+                                   speed=getattr(config, "STREAM_REPLAY_SPEED", None))
+    raise ValueError(f"unknown feed {kind!r}")
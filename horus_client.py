@@ -1,9 +1,14 @@
 # horus_client.py
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
-import requests
 import config
+import metrics
 import logging
+import numpy as np
+from http_pool import PooledHTTP
+from series import PriceSeries
 
 SUPPORTED_ASSETS = {
     "BTC","ETH","XRP","BNB","SOL","DOGE","TRX","ADA","XLM","WBTC","SUI","HBAR","LINK","BCH","WBETH",
@@ -18,8 +23,80 @@ FALLBACK_PX_KEYS = ["price", "close", "c", "p", "value"]
 QUOTE_SUFFIXES = getattr(config, "ROOSTOO_QUOTE_SUFFIXES", ["USD", "USDT", "USDC"])
 
 
+def ts_to_epoch_ms(ts) -> int | None:
+    try:
+        if isinstance(ts, (int, float)):
+            return int(ts) if ts > 1e12 else int(ts * 1000)
+        if isinstance(ts, str):
+            if ts.endswith("Z"):
+                dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+            else:
+                dt = datetime.fromisoformat(ts)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return int(dt.timestamp() * 1000)
+        if isinstance(ts, datetime):
+            if ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+            return int(ts.timestamp() * 1000)
+        return None
+    except Exception:
+        return None
+
+
+def normalize_ts_ms(values: list) -> tuple[np.ndarray, np.ndarray]:
+    # single ingest path: raw Horus timestamps (sec / ms numbers, numeric strings or ISO-8601)
+    # -> int64 epoch-ms plus a validity mask; every downstream consumer works on these ints
+    n = len(values)
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        arr = None
+    if arr is not None:
+        valid = np.isfinite(arr)
+        ms = np.where(arr > 1e12, arr, arr * 1000.0)
+        ms = np.where(valid, ms, 0).astype(np.int64)
+        return ms, valid
+    ms = np.zeros(n, dtype=np.int64)
+    valid = np.zeros(n, dtype=bool)
+    for i, v in enumerate(values):
+        t = ts_to_epoch_ms(v)
+        if t is not None:
+            ms[i] = t
+            valid[i] = True
+    return ms, valid
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, burst: int = 1):
+        self.rate = max(float(rate_per_sec), 1e-9)
+        self.capacity = max(int(burst), 1)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# shared by every HorusClient in the process so the API quota is respected globally
+_RATE_LIMITER = TokenBucket(
+    rate_per_sec=getattr(config, "HORUS_RATE_PER_SEC", 5.0),
+    burst=getattr(config, "HORUS_RATE_BURST", 5),
+)
+
+
 class HorusClient:
-    def __init__(self, url=None, api_key=None):
+    def __init__(self, url=None, api_key=None, store=None):
         self.url = (url or getattr(config, "HORUS_PRICE_URL")).rstrip("/")
         self.api_key = api_key or getattr(config, "HORUS_API_KEY", "")
         self.header_key = getattr(config, "HORUS_HEADER_KEY", "X-API-Key")
@@ -42,19 +119,28 @@ class HorusClient:
             self.px_keys = FALLBACK_PX_KEYS
 
         self.debug = bool(getattr(config, "DEBUG_HORUS", True))
-
-        self._last_req_ts = 0.0
-        self._min_interval = float(getattr(config, "HORUS_MIN_INTERVAL_SEC", 0.2))
+        # optional price_store.PriceStore; every parsed response is written through to it
+        self.store = store
+
+        self.rate_limiter = _RATE_LIMITER
+        self.max_workers = int(getattr(config, "HORUS_MAX_WORKERS", 8))
+        self.http = PooledHTTP(
+            "horus",
+            pool_size=max(self.max_workers, int(getattr(config, "HTTP_POOL_SIZE", 10))),
+            default_timeout=float(getattr(config, "HORUS_TIMEOUT_SEC", 10)),
+        )
+
+        # incremental backfill state: merged rows per pair and the newest ts seen (epoch ms)
+        self.overlap = timedelta(minutes=float(getattr(config, "HORUS_BACKFILL_OVERLAP_MIN", 30)))
+        self._series: dict[str, PriceSeries] = {}
+        self._hwm: dict[str, int] = {}
+        self._series_lock = threading.Lock()
 
     def _headers(self):
         return {self.header_key: self.api_key} if self.api_key else {}
 
     def _throttle(self):
-        now = time.time()
-        gap = now - self._last_req_ts
-        if gap < self._min_interval:
-            time.sleep(self._min_interval - gap)
-        self._last_req_ts = time.time()
+        self.rate_limiter.acquire()
 
     def asset_from_pair(self, pair: str) -> str:
         p = pair.upper().replace("-", "/")
@@ -71,13 +157,98 @@ class HorusClient:
     def is_supported(self, asset: str) -> bool:
         return asset.upper() in SUPPORTED_ASSETS
 
-    def fetch_range_prices(self, pair: str, start_utc: datetime, end_utc: datetime) -> list[dict]:
+    def fetch_range_prices(self, pair: str, start_utc: datetime, end_utc: datetime) -> PriceSeries:
+        series, _ = self._fetch(pair, start_utc, end_utc)
+        return series
+
+    def fetch_many(
+        self, pairs: list[str], start_utc: datetime | dict[str, datetime], end_utc: datetime
+    ) -> tuple[dict[str, PriceSeries], dict[str, str]]:
+        # returns (series per pair, error per pair); a failed pair maps to an empty series
+        # start_utc may be a single datetime or a per-pair mapping
+        results: dict[str, PriceSeries] = {}
+        errors: dict[str, str] = {}
+        pairs = list(dict.fromkeys(pairs))
+        if not pairs:
+            return results, errors
+
+        starts = start_utc if isinstance(start_utc, dict) else dict.fromkeys(pairs, start_utc)
+        workers = max(1, min(self.max_workers, len(pairs)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="horus") as pool:
+            futures = {p: pool.submit(self._fetch, p, starts[p], end_utc) for p in pairs}
+            for pair, fut in futures.items():
+                try:
+                    series, err = fut.result()
+                except Exception as e:
+                    series, err = PriceSeries.empty(), f"unexpected error: {e}"
+                results[pair] = series
+                if err:
+                    errors[pair] = err
+        return results, errors
+
+    def fetch_incremental(
+        self, pairs: list[str], lookback: timedelta, end_utc: datetime
+    ) -> tuple[dict[str, PriceSeries], dict[str, str]]:
+        # first call per pair backfills the whole lookback; later calls only ask for
+        # [high-water mark - overlap, end] and merge the new rows in, de-duplicated on ts
+        window_start = end_utc - lookback
+        starts: dict[str, datetime] = {}
+        for p in dict.fromkeys(pairs):
+            hwm = self._hwm.get(p)
+            if hwm is None:
+                starts[p] = window_start
+            else:
+                since = datetime.fromtimestamp(hwm / 1000.0, tz=timezone.utc) - self.overlap
+                starts[p] = max(since, window_start)
+
+        fresh, errors = self.fetch_many(list(starts), starts, end_utc)
+
+        cutoff_ms = int(window_start.timestamp() * 1000)
+        results: dict[str, PriceSeries] = {}
+        with self._series_lock:
+            for p, series in fresh.items():
+                merged = self._series.get(p, PriceSeries.empty()).merge(series).since(cutoff_ms)
+                self._series[p] = merged
+                if len(merged):
+                    self._hwm[p] = merged.last_ts
+                else:
+                    self._hwm.pop(p, None)
+                results[p] = merged
+                if self.debug and starts[p] != window_start:
+                    logging.info(f"[horus] {p} incremental new_rows={len(series)} total={len(merged)}")
+        return results, errors
+
+    def http_stats(self) -> dict:
+        return self.http.stats()
+
+    def close(self) -> None:
+        self.http.close()
+
+    def seed(self, pair: str, series: PriceSeries) -> None:
+        # prime the incremental cache (e.g. from the local store) so the next fetch is a delta
+        if not len(series):
+            return
+        with self._series_lock:
+            merged = self._series.get(pair, PriceSeries.empty()).merge(series)
+            self._series[pair] = merged
+            self._hwm[pair] = merged.last_ts
+
+    def reset_incremental(self, pair: str | None = None) -> None:
+        with self._series_lock:
+            if pair is None:
+                self._series.clear()
+                self._hwm.clear()
+            else:
+                self._series.pop(pair, None)
+                self._hwm.pop(pair, None)
+
+    def _fetch(self, pair: str, start_utc: datetime, end_utc: datetime) -> tuple[PriceSeries, str | None]:
 
         asset = self.asset_from_pair(pair)
         if not self.is_supported(asset):
             if self.debug:
                 logging.info(f"[horus] skip unsupported asset {asset} for {pair}")
-            return []
+            return PriceSeries.empty(), f"unsupported asset {asset}"
 
         params = {self.asset_key: asset, "format": "json"}
         if self.start_key:
@@ -90,27 +261,32 @@ class HorusClient:
         self._throttle()
 
         try:
-            r = requests.get(self.url, headers=self._headers(), params=params, timeout=10)
+            r = self.http.get(self.url, endpoint="price", headers=self._headers(), params=params)
         except Exception as e:
             logging.warning(f"[horus] request error for {pair}->{asset}: {e}")
-            return []
+            return PriceSeries.empty(), f"request error: {e}"
 
         if r.status_code in (400, 404, 422):
             if self.debug:
                 logging.info(f"[horus] {pair}->{asset} http={r.status_code} url={r.url}")
-            return []
+            return PriceSeries.empty(), f"http {r.status_code}"
 
         if r.status_code == 429:
             logging.warning(f"[horus] RATE LIMITED (429) for {pair}->{asset}, url={r.url}")
-            return []
+            return PriceSeries.empty(), "rate limited (429)"
 
         try:
             r.raise_for_status()
         except Exception as e:
             logging.error(f"[horus] http error for {pair}->{asset}: {e}")
-            return []
+            return PriceSeries.empty(), f"http error: {e}"
 
-        raw = r.json()
+        t_parse = time.perf_counter()
+        try:
+            raw = r.json()
+        except ValueError as e:
+            logging.error(f"[horus] bad json for {pair}->{asset}: {e}")
+            return PriceSeries.empty(), f"bad json: {e}"
 
         if isinstance(raw, dict):
             raw = [raw]
@@ -120,7 +296,8 @@ class HorusClient:
                 f"[horus] {pair}->{asset} sample_keys={list(raw[0].keys())} n={len(raw)}"
             )
 
-        out: list[dict] = []
+        ts_raw: list = []
+        px_raw: list[float] = []
 
         for row in (raw or []):
             ts_val = None
@@ -143,14 +320,21 @@ class HorusClient:
             except Exception:
                 continue
 
-            out.append(
-                {
-                    "timestamp": ts_val, 
-                    "price": price_f,
-                }
-            )
+            ts_raw.append(ts_val)
+            px_raw.append(price_f)
+
+        ts_ms, valid = normalize_ts_ms(ts_raw)
+        out = PriceSeries.from_unsorted(ts_ms[valid], np.asarray(px_raw, dtype=np.float64)[valid])
+        metrics.observe("horus_parse_ms", (time.perf_counter() - t_parse) * 1000.0)
+        metrics.inc("horus_rows_total", len(out))
 
         if self.debug:
             logging.info(f"[horus] {pair}->{asset} parsed_rows={len(out)}")
 
-        return out
+        if self.store is not None and len(out):
+            try:
+                self.store.append(asset, self.interval_val, out)
+            except OSError as e:
+                logging.error(f"[horus] price store write failed for {asset}: {e}")
+
+        return out, None
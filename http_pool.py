@@ -0,0 +1,113 @@
+# http_pool.py
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+import metrics
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class _CountingAdapter(HTTPAdapter):
+    def connection_stats(self) -> tuple[int, int]:
+        # urllib3 keeps one pool per host; num_connections only grows on a fresh TCP/TLS handshake
+        conns = reqs = 0
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            conns += getattr(pool, "num_connections", 0)
+            reqs += getattr(pool, "num_requests", 0)
+        return conns, reqs
+
+
+class PooledHTTP:
+    def __init__(
+        self,
+        name: str,
+        pool_size: int | None = None,
+        max_retries: int | None = None,
+        backoff: float | None = None,
+        timeouts: dict[str, float] | None = None,
+        default_timeout: float = 5.0,
+    ):
+        self.name = name
+        self.pool_size = int(pool_size or getattr(config, "HTTP_POOL_SIZE", 10))
+        retries = int(getattr(config, "HTTP_MAX_RETRIES", 2) if max_retries is None else max_retries)
+        backoff = float(getattr(config, "HTTP_BACKOFF_SEC", 0.3) if backoff is None else backoff)
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = float(default_timeout)
+
+        # only idempotent methods are retried here; order placement retries live in execution.py
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+        self._adapter = _CountingAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._calls: dict[str, int] = {}
+
+    def timeout_for(self, endpoint: str | None) -> float:
+        if endpoint is None:
+            return self.default_timeout
+        return float(self.timeouts.get(endpoint, self.default_timeout))
+
+    def request(self, method: str, url: str, endpoint: str | None = None, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout_for(endpoint))
+        key = endpoint or "default"
+        with self._lock:
+            self._calls[key] = self._calls.get(key, 0) + 1
+        if not metrics.enabled():
+            return self.session.request(method, url, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            resp = self.session.request(method, url, **kwargs)
+        except Exception as e:
+            metrics.inc("http_errors_total", client=self.name, endpoint=key, error=type(e).__name__)
+            raise
+        finally:
+            metrics.observe("http_request_ms", (time.perf_counter() - t0) * 1000.0, client=self.name, endpoint=key)
+        metrics.inc("http_requests_total", client=self.name, endpoint=key, status=resp.status_code)
+        return resp
+
+    def get(self, url: str, endpoint: str | None = None, **kwargs) -> requests.Response:
+        return self.request("GET", url, endpoint=endpoint, **kwargs)
+
+    def post(self, url: str, endpoint: str | None = None, **kwargs) -> requests.Response:
+        return self.request("POST", url, endpoint=endpoint, **kwargs)
+
+    def stats(self) -> dict:
+        conns, reqs = self._adapter.connection_stats()
+        with self._lock:
+            calls = dict(self._calls)
+        return {
+            "name": self.name,
+            "calls": calls,
+            "requests": reqs,
+            "new_connections": conns,
+            "reused_connections": max(reqs - conns, 0),
+            "reuse_ratio": (reqs - conns) / reqs if reqs else 0.0,
+        }
+
+    def close(self) -> None:
+        self.session.close()
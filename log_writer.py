@@ -0,0 +1,192 @@
+# log_writer.py
+from __future__ import annotations
+
+import atexit
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import config
+
+# One background thread owns every CSV log file. Callers enqueue rows and return immediately;
+# the flusher drains the queue in batches, keeps the files open and rotates them by size or UTC
+# day. A file whose header differs from the expected one is rotated aside before the first write.
+
+_STOP = object()
+
+
+class _CsvFile:
+    def __init__(self, path: str, header: list[str], max_bytes: int, daily: bool):
+        self.path = path
+        self.header = list(header)
+        self.max_bytes = max_bytes
+        self.daily = daily
+        self.f = None
+        self.w = None
+        self.day = None
+
+    def _open(self, day) -> None:
+        # day is the UTC date of the records about to be written; an existing file last written
+        # on another day (mtime = its newest record) is rotated aside before they go in
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                first = next(csv.reader(f), None)
+            if first != self.header or (self.daily and self._mtime_day() != day):
+                self._rotate_existing()
+        self.f = open(self.path, "a", newline="", encoding="utf-8")
+        self.w = csv.writer(self.f)
+        if self.f.tell() == 0:
+            self.w.writerow(self.header)
+        self.day = day
+
+    def _mtime_day(self):
+        return datetime.fromtimestamp(os.path.getmtime(self.path), tz=timezone.utc).date()
+
+    def _rotate_existing(self, day=None) -> None:
+        stem, ext = os.path.splitext(self.path)
+        tag = (day or self._mtime_day()).strftime("%Y%m%d")
+        dest = f"{stem}.{tag}{ext}"
+        n = 1
+        while os.path.exists(dest):
+            dest = f"{stem}.{tag}.{n}{ext}"
+            n += 1
+        os.replace(self.path, dest)
+
+    def _maybe_rotate(self, day) -> None:
+        too_big = self.max_bytes and self.f.tell() >= self.max_bytes
+        if too_big or (self.daily and day != self.day):
+            self.close()
+            self._rotate_existing(self.day)
+            self._open(day)
+
+    def write_rows(self, rows: list[list], day) -> None:
+        # every row in `rows` belongs to the UTC date `day`
+        if self.f is None:
+            self._open(day)
+        else:
+            self._maybe_rotate(day)
+        self.w.writerows(rows)
+        self.f.flush()
+
+    def close(self) -> None:
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+            self.w = None
+
+
+class LogWriter:
+    def __init__(self, max_bytes: int | None = None, daily: bool | None = None,
+                 flush_sec: float | None = None, queue_size: int | None = None):
+        self.max_bytes = int(getattr(config, "LOG_ROTATE_MAX_BYTES", 10_000_000) if max_bytes is None else max_bytes)
+        self.daily = bool(getattr(config, "LOG_ROTATE_DAILY", True) if daily is None else daily)
+        self.flush_sec = float(flush_sec or getattr(config, "LOG_FLUSH_SEC", 1.0))
+        self._q: queue.Queue = queue.Queue(maxsize=int(queue_size or getattr(config, "LOG_QUEUE_SIZE", 10_000)))
+        self._files: dict[str, _CsvFile] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.dropped = 0
+
+    def register(self, path: str, header: list[str]) -> None:
+        with self._lock:
+            if path not in self._files:
+                self._files[path] = _CsvFile(path, header, self.max_bytes, self.daily)
+
+    def write(self, path: str, row: list) -> None:
+        # never blocks the caller; when the queue is full the row is dropped and counted. The
+        # enqueue time decides the row's day, so a batch flushed after midnight still splits
+        self._ensure_started()
+        try:
+            self._q.put_nowait((path, row, time.time()))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logging.error(f"[log_writer] queue full, dropped={self.dropped}")
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._q.get(timeout=self.flush_sec)
+            except queue.Empty:
+                continue
+            batch = [item]
+            # pick up whatever else is already queued so a burst becomes one write per file
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(b is _STOP for b in batch)
+            self._write_batch([b for b in batch if b is not _STOP])
+            for _ in batch:
+                self._q.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: list) -> None:
+        # rows per path, split into runs of the same UTC day in queue order
+        by_path: dict[str, list[tuple]] = {}
+        for path, row, ts in batch:
+            day = datetime.fromtimestamp(ts, tz=timezone.utc).date()
+            runs = by_path.setdefault(path, [])
+            if runs and runs[-1][0] == day:
+                runs[-1][1].append(row)
+            else:
+                runs.append((day, [row]))
+        for path, runs in by_path.items():
+            sink = self._files.get(path)
+            if sink is None:
+                n = sum(len(rows) for _, rows in runs)
+                logging.error(f"[log_writer] unregistered log {path}, {n} rows dropped")
+                continue
+            for day, rows in runs:
+                try:
+                    sink.write_rows(rows, day)
+                except Exception as e:
+                    logging.error(f"[log_writer] failed to write {path}: {e}")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        # waits until every row queued so far is on disk
+        if self._thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self._q.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._q.unfinished_tasks
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._q.put(_STOP)
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            for sink in self._files.values():
+                sink.close()
+
+
+_writer: LogWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> LogWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LogWriter()
+                atexit.register(_writer.close)
+    return _writer
@@ -2,21 +2,36 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import asyncio
 import logging
 import time
-import os
-import csv
 from datetime import datetime, timezone, timedelta
-from typing import Iterable, Dict, Any, List, Tuple
-from collections import defaultdict, deque
-from zoneinfo import ZoneInfo
+from typing import Dict, List, Tuple
+
+import numpy as np
 
 import config
-from horus_client import HorusClient
+from horus_client import HorusClient, SUPPORTED_ASSETS
+from data_handler import LiveDataHandler
+from series import PriceSeries
+from clock import SimClock, SystemClock
+from feeds import make_feed
+from scheduler import FireEvent, Scheduler, StageTimer
+import metrics
+from log_writer import get_writer
+from exchange_info import ExchangeInfoCache, offline_rules
+from tickers import TickerService
+from universe import UniverseSelector
+from sinks import NullSink, RowSink, StdoutSink, make_sink
+from price_store import PriceStore
+from snapshot import load_snapshot, save_snapshot
 from strategies.manager import StrategyManager
+from strategies.registry import DataNeeds
 from exchange_client import ExchangeClient
 from portfolio import calc_rebalance_orders
-from execution import execute_orders
+from execution import execute_orders, execute_orders_async
+from async_clients import AsyncExchangeClient, AsyncHorusClient
+from backtest.backtest_runner import SimExchange
 
 
 logging.basicConfig(
@@ -35,279 +50,601 @@ UNIVERSE: List[Tuple[str, str]] = [
     ("XRP/USD", "XRP"),
 ]
 
-def _to_iso8601_utc(ts) -> str | None:
-    try:
-        if isinstance(ts, (int, float)):
-            if ts > 1e12:  # 毫秒轉秒
-                ts = ts / 1000.0
-            return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
-        if isinstance(ts, str):
-            if ts.endswith("Z"):
-                return datetime.fromisoformat(ts.replace("Z", "+00:00")).isoformat()
-            if "+" in ts:
-                return datetime.fromisoformat(ts).astimezone(timezone.utc).isoformat()
-            return (datetime.fromisoformat(ts).replace(tzinfo=timezone.utc)).isoformat()
-        if isinstance(ts, datetime):
-            if ts.tzinfo is None:
-                ts = ts.replace(tzinfo=timezone.utc)
-            return ts.astimezone(timezone.utc).isoformat()
-        return str(ts)
-    except Exception:
-        return None
-
-
-def filter_rows_by_day_utc(rows: Iterable[Dict[str, Any]], day_yyyy_mm_dd: str) -> List[Dict[str, Any]]:
+def filter_rows_by_day_utc(series: PriceSeries, day_yyyy_mm_dd: str) -> PriceSeries:
     start = datetime.strptime(day_yyyy_mm_dd, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-    end = start + timedelta(days=1)
-    kept: List[Dict[str, Any]] = []
-    for r in rows or []:
-        ts = r.get("timestamp")
-        dt_utc_iso = _to_iso8601_utc(ts)
-        if not dt_utc_iso:
-            continue
-        dt_utc = datetime.fromisoformat(dt_utc_iso)
-        if start <= dt_utc < end:
-            kept.append(r)
-    return kept
-
-
-def emit_rows_csv(symbol: str, rows: Iterable[Dict[str, Any]]) -> None:
-    for r in rows or []:
-        ts_iso = _to_iso8601_utc(r.get("timestamp"))
-        price = r.get("price")
-        if ts_iso is None or price is None:
-            continue
-        print(f"{symbol},{ts_iso},{price}")
+    start_ms = int(start.timestamp() * 1000)
+    return series.between(start_ms, start_ms + 86_400_000)
+
+
+def emit_rows_csv(symbol: str, series: PriceSeries) -> None:
+    StdoutSink().emit(symbol, series)
 
 
 def process_and_emit(
     symbol: str,
-    raw_rows: Iterable[Dict[str, Any]] | None,
+    series: PriceSeries | None,
     day_yyyy_mm_dd: str,
     fallback_last_n: int = 20,
+    sink: RowSink | None = None,
 ) -> int:
-    raw_rows = list(raw_rows or [])
-    picked = filter_rows_by_day_utc(raw_rows, day_yyyy_mm_dd)
-    if not picked and raw_rows:
-        picked = raw_rows[-fallback_last_n:]
-    emit_rows_csv(symbol, picked)
-    return len(picked)
-
-
-def normalize_rows_to_tp(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-    for r in rows or []:
-        ts = r.get("timestamp")
-        px = r.get("price")
-        if px is None or ts is None:
-            continue
-        try:
-            price_f = float(px)
-        except Exception:
-            continue
-        out.append({"timestamp": ts, "price": price_f})
-    return out
+    # the first emit per symbol covers today's rows (or the last few); afterwards only new bars
+    if series is None:
+        return 0
+    sink = sink or StdoutSink()
+    picked = sink.new_rows(symbol, series)
+    if picked is None:
+        picked = filter_rows_by_day_utc(series, day_yyyy_mm_dd)
+        if not picked and series:
+            picked = series.tail(fallback_last_n)
+    return sink.emit(symbol, picked)
 
-class LiveDataHandler:
-    def __init__(self, maxlen: int = 1000):
-        self.buffers: dict[str, deque] = defaultdict(lambda: deque(maxlen=maxlen))
-        self.ny = ZoneInfo("America/New_York")
-        self.first4h_cache: dict[tuple[str, str], tuple[float, float]] = {}
 
-    def _to_dt_utc(self, ts) -> datetime | None:
-        try:
-            if isinstance(ts, (int, float)):
-                if ts > 1e12:
-                    ts = ts / 1000.0
-                return datetime.fromtimestamp(ts, tz=timezone.utc)
-            if isinstance(ts, str):
-                if ts.endswith("Z"):
-                    return datetime.fromisoformat(ts.replace("Z", "+00:00")).astimezone(timezone.utc)
-                if "+" in ts:
-                    return datetime.fromisoformat(ts).astimezone(timezone.utc)
-                return datetime.fromisoformat(ts).replace(tzinfo=timezone.utc)
-            if isinstance(ts, datetime):
-                if ts.tzinfo is None:
-                    return ts.replace(tzinfo=timezone.utc)
-                return ts.astimezone(timezone.utc)
-            return None
-        except Exception:
-            return None
-
-    def update_series(self, pair: str, rows: List[Dict[str, Any]]) -> None:
-        dq = self.buffers[pair]
-        dq.clear()
-        for r in sorted(rows, key=lambda x: x["timestamp"]):
-            dt = self._to_dt_utc(r["timestamp"])
-            if dt is None:
-                continue
-            dq.append((dt, r["price"]))
-
-    def _first_4h_window_utc(self, any_utc: datetime):
-        ny_dt = any_utc.astimezone(self.ny)
-        start_ny = datetime(ny_dt.year, ny_dt.month, ny_dt.day, 0, 0, tzinfo=self.ny)
-        end_ny = start_ny + timedelta(hours=4)
-        return start_ny.astimezone(timezone.utc), end_ny.astimezone(timezone.utc), start_ny.date()
-
-    def is_after_first4h_close(self) -> bool:
-        now_utc = datetime.now(timezone.utc)
-        ny_dt = now_utc.astimezone(self.ny)
-        return ny_dt.hour >= 4
-
-    def get_first4h_range(self, pair: str):
-        dq = self.buffers.get(pair)
-        if not dq:
-            return None, None, None
-        last_ts = dq[-1][0]
-        start_utc, end_utc, ny_date = self._first_4h_window_utc(last_ts)
-        key = (pair, ny_date)
-        if key in self.first4h_cache:
-            hi, lo = self.first4h_cache[key]
-            return hi, lo, str(ny_date)
-        hi = None
-        lo = None
-        for ts, px in dq:
-            if start_utc <= ts < end_utc:
-                hi = px if hi is None else max(hi, px)
-                lo = px if lo is None else min(lo, px)
-        if hi is not None and lo is not None:
-            self.first4h_cache[key] = (hi, lo)
-            return hi, lo, str(ny_date)
-        return None, None, str(ny_date)
-
-    def first4h_ready(self, pair: str) -> bool:
-        hi, lo, _ = self.get_first4h_range(pair)
-        return hi is not None and lo is not None
-
-    def is_5m_bar_close(self, pair: str) -> bool:
-        return True
-
-    def get_5m_close(self, pair: str):
-        dq = self.buffers.get(pair)
-        if not dq:
-            return None
-        return dq[-1][1]
-
-
-_horus_client = HorusClient()
-_exchange_client = ExchangeClient()
-_strategy_manager = StrategyManager(allow_short=config.ALLOW_SHORT)
-
-def get_price_rows(symbol_pair: str) -> List[Dict[str, Any]]:
-    end = datetime.now(timezone.utc)
-    lookback_hours = getattr(config, "LOOKBACK_HOURS", 24)
-    start = end - timedelta(hours=lookback_hours)
-    return _horus_client.fetch_range_prices(symbol_pair, start, end)
+# liquidity reported for pairs with no ticker data; large enough to pass MIN_24H_VOLUME
+UNKNOWN_LIQUIDITY = 1e12
 
 EQUITY_LOG_FILE = getattr(config, "EQUITY_LOG_FILE", "logs/equity.csv")
 
 def log_equity_snapshot(total_equity: float, usd_free: float):
+    if not EQUITY_LOG_FILE:
+        return
     try:
-        if EQUITY_LOG_FILE:
-            os.makedirs(os.path.dirname(EQUITY_LOG_FILE), exist_ok=True)
-            file_exists = os.path.exists(EQUITY_LOG_FILE)
-            with open(EQUITY_LOG_FILE, "a", newline="", encoding="utf-8") as f:
-                w = csv.writer(f)
-                if not file_exists:
-                    w.writerow(["ts", "equity", "cash"])
-                w.writerow([
-                    datetime.now(timezone.utc).isoformat(),
-                    f"{total_equity:.8f}",
-                    f"{usd_free:.8f}",
-                ])
+        writer = get_writer()
+        writer.register(EQUITY_LOG_FILE, ["ts", "equity", "cash"])
+        writer.write(EQUITY_LOG_FILE, [
+            datetime.now(timezone.utc).isoformat(),
+            f"{total_equity:.8f}",
+            f"{usd_free:.8f}",
+        ])
     except Exception as e:
         logging.error(f"failed to append equity log: {e}")
 
-def run_once():
-    today_utc_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
-    data_handler = LiveDataHandler()
-    prices: dict[str, float] = {}
-    liquidity: dict[str, float] = {}
-
-    for symbol_pair, internal_symbol in UNIVERSE:
-        rows = get_price_rows(symbol_pair)
-
-        sample_keys = []
-        n = 0
-        if rows:
-            sample_keys = list(rows[0].keys())[:2]
-            n = len(rows)
-        logger.info(
-            "[horus] %s->%s sample_keys=%s n=%d",
-            symbol_pair,
-            internal_symbol,
-            sample_keys or ["timestamp", "price"],
-            n,
-        )
 
-        parsed_rows = normalize_rows_to_tp(rows)
+class TradingEngine:
+    def __init__(
+        self,
+        universe: List[Tuple[str, str]] | None = None,
+        horus_client: HorusClient | None = None,
+        exchange_client: ExchangeClient | None = None,
+        strategy_manager: StrategyManager | None = None,
+        data_handler: LiveDataHandler | None = None,
+        clock=None,
+        live: bool = True,
+    ):
+        # live=False is an offline run (stream replay): no snapshot, no local price store, no
+        # ticker / exchangeInfo services and no CSV logs, so it never touches live trading state
+        self.live = live
+        self.universe = list(universe or UNIVERSE)
+        self.clock = clock or SystemClock()
+        self.horus_client = horus_client
+        self.exchange_client = exchange_client
+        self.strategy_manager = strategy_manager
+        self.data_handler = data_handler
+        self.started = False
+        self.timer = StageTimer()
+        self.sink: RowSink = NullSink()
+        self.exchange_info: ExchangeInfoCache | None = None
+        self.tickers: TickerService | None = None
+        self.selector: UniverseSelector | None = None
+        self.held: set[str] = set()
+        self.needs: DataNeeds | None = None
+
+    def start(self) -> None:
+        if self.started:
+            return
+        if self.strategy_manager is None:
+            self.strategy_manager = StrategyManager(allow_short=config.ALLOW_SHORT)
+        # only fetch what the active strategies declared in the registry
+        self.needs = self.strategy_manager.needs
+        self.universe = [(p, a) for p, a in self.universe if self.needs.wants(a)]
+        if self.horus_client is None:
+            self.horus_client = HorusClient()
+            self.horus_client.interval_val = self.needs.interval
+        if self.exchange_client is None:
+            self.exchange_client = ExchangeClient()
+        if self.data_handler is None:
+            self.data_handler = LiveDataHandler(clock=self.clock)
+        if self.live and getattr(config, "USE_PRICE_STORE", False) and self.horus_client.store is None:
+            self.horus_client.store = PriceStore()
+        self.metrics_exporter = metrics.start_exporter()
+        self.offline_rules = None if self.live else offline_rules()
+        if self.live and hasattr(self.exchange_client, "get_exchange_info"):
+            self.exchange_info = ExchangeInfoCache(self.exchange_client).start()
+        if self.live and hasattr(self.exchange_client, "get_all_tickers"):
+            self.tickers = TickerService(self.exchange_client)
+            if getattr(config, "UNIVERSE_DYNAMIC", False):
+                supported = SUPPORTED_ASSETS if self.needs.assets is None else SUPPORTED_ASSETS & self.needs.assets
+                pinned = [p for p in getattr(config, "UNIVERSE_PINNED", []) if self.needs.wants(p.split("/")[0])]
+                self.selector = UniverseSelector(self.tickers, self.exchange_info, pinned=pinned, supported=supported)
+                self.tickers.refresh()
+                self.refresh_universe(warm=False)
+        self.snapshot_file = getattr(config, "SNAPSHOT_FILE", None) if self.live else None
+        if self.snapshot_file:
+            self.restore_snapshot()
+        if self.horus_client.store is not None:
+            self.warm_from_store()
+        self.sink = make_sink(store=self.horus_client.store, interval=self.horus_client.interval_val)
+        self.started = True
         logger.info(
-            "[horus] %s->%s parsed_rows=%d",
-            symbol_pair,
-            internal_symbol,
-            len(parsed_rows),
+            "engine started: universe=%d strategies=%d %s",
+            len(self.universe), len(self.strategy_manager.strategies), self.needs,
         )
-        if not parsed_rows:
-            logger.info("[horus] no rows for %s %s", symbol_pair, today_utc_str)
-            continue
 
+    def restore_snapshot(self) -> None:
+        t0 = time.perf_counter()
+        state = load_snapshot(self.snapshot_file)
+        if not state:
+            return
         try:
-            process_and_emit(
-                internal_symbol, parsed_rows, today_utc_str, fallback_last_n=20
+            self.data_handler.set_state(state.get("data_handler", {}))
+            self.strategy_manager.set_state(state.get("strategies", []))
+        except Exception:
+            logger.exception("[snapshot] restore failed, starting cold")
+            self.data_handler.set_state({})
+            self.strategy_manager.reset()
+            return
+        for symbol_pair, _ in self.universe:
+            self.horus_client.seed(symbol_pair, self.data_handler.series(symbol_pair))
+        logger.info("[snapshot] restored in %.1f ms", (time.perf_counter() - t0) * 1000.0)
+
+    def save_snapshot(self) -> None:
+        if not self.snapshot_file:
+            return
+        try:
+            state = {
+                "data_handler": self.data_handler.get_state(),
+                "strategies": self.strategy_manager.get_state(),
+            }
+            save_snapshot(self.snapshot_file, state)
+        except Exception:
+            logger.exception("[snapshot] save failed")
+
+    def warm_from_store(self, pairs: list[str] | None = None) -> None:
+        # cold start: the declared lookback from disk into the handler and the Horus delta cache
+        if pairs is None:
+            pairs = [symbol_pair for symbol_pair, _ in self.universe]
+        store = self.horus_client.store
+        interval = self.horus_client.interval_val
+        lookback_hours = self.needs.lookback_hours
+        since_ms = self.clock.now_ms() - int(lookback_hours * 3_600_000)
+        t0 = time.perf_counter()
+        rows = 0
+        for symbol_pair in pairs:
+            asset = self.horus_client.asset_from_pair(symbol_pair)
+            series = store.read(asset, interval, start_ms=since_ms)
+            if not series:
+                continue
+            series = PriceSeries(np.array(series.ts), np.array(series.px))
+            self.data_handler.update_series(symbol_pair, series)
+            self.horus_client.seed(symbol_pair, series)
+            rows += len(series)
+        logger.info("[store] warm start rows=%d in %.1f ms", rows, (time.perf_counter() - t0) * 1000.0)
+
+    def refresh_universe(self, warm: bool = True) -> None:
+        # re-rank on the selector's cadence; new pairs start from the store (if any) and get their
+        # full Horus lookback on the next fetch, dropped pairs release their incremental cache
+        if self.selector is None or not self.selector.due():
+            return
+        t0 = time.perf_counter()
+        new = self.selector.select(self.universe, keep=self.held)
+        old_pairs = {p for p, _ in self.universe}
+        new_pairs = {p for p, _ in new}
+        added, dropped = sorted(new_pairs - old_pairs), sorted(old_pairs - new_pairs)
+        self.universe = new
+        for pair in dropped:
+            self.horus_client.reset_incremental(pair)
+        if warm and added and self.horus_client.store is not None:
+            self.warm_from_store(added)
+        if added or dropped:
+            logger.info(
+                "[universe] %d pairs, added=%s dropped=%s in %.1f ms",
+                len(new), added, dropped, (time.perf_counter() - t0) * 1000.0,
             )
-        except Exception as e:
-            logger.exception("emit csv failed for %s: %s", internal_symbol, e)
 
-        data_handler.update_series(symbol_pair, parsed_rows)
-        last_price = parsed_rows[-1]["price"]
-        prices[symbol_pair] = last_price
-        liquidity[symbol_pair] = 1e12 
+    def log_http_stats(self) -> None:
+        for client in (self.horus_client, self.exchange_client):
+            if client is not None and hasattr(client, "http_stats"):
+                logger.info("[http] %s", client.http_stats())
+
+    def shutdown(self) -> None:
+        if not self.started:
+            return
+        self.log_http_stats()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        get_writer().flush()
+        self.strategy_manager.close()
+        if self.exchange_info is not None:
+            self.exchange_info.stop()
+        self.sink.close()
+        for client in (self.horus_client, self.exchange_client):
+            if not hasattr(client, "close"):
+                continue
+            try:
+                client.close()
+            except Exception:
+                logger.exception("failed to close %s", type(client).__name__)
+        self.started = False
+        logger.info("engine stopped")
+
+    def fetch_price_rows(self) -> Dict[str, PriceSeries]:
+        end = self.clock.now()
+        lookback_hours = self.needs.lookback_hours
+        pairs = [symbol_pair for symbol_pair, _ in self.universe]
+        if not pairs:
+            return {}
+        results, errors = self.horus_client.fetch_incremental(pairs, timedelta(hours=lookback_hours), end)
+        for pair, err in errors.items():
+            logger.warning("[horus] fetch failed for %s: %s", pair, err)
+        return results
+
+    def tick(self, event: FireEvent | None = None) -> None:
+        if not self.started:
+            self.start()
+        self.timer = StageTimer()
+        try:
+            self._tick()
+        finally:
+            with self.timer.stage("snapshot"):
+                self.save_snapshot()
+            late = f" late={event.late_ms}ms" if event is not None else ""
+            logger.info("[cycle]%s %s", late, self.timer.finish())
+
+    def _tick(self) -> None:
+        prices, liquidity = self.ingest()
+        self.evaluate(prices, liquidity)
+
+    def ingest(self) -> tuple[dict[str, float], dict[str, float]]:
+        if self.tickers is not None:
+            with self.timer.stage("tickers"):
+                self.tickers.refresh()
+            with self.timer.stage("universe"):
+                self.refresh_universe()
+        with self.timer.stage("fetch"):
+            rows_by_pair = self.fetch_price_rows()
+        prices, liquidity = self.apply_rows(rows_by_pair)
+        self.apply_tickers(prices, liquidity)
+        return prices, liquidity
+
+    def apply_tickers(self, prices: dict[str, float], liquidity: dict[str, float],
+                      use_prices: bool = True) -> None:
+        # overlays this cycle's ticker snapshot on the universe: exchange last price and real
+        # 24h volume. Pairs without a ticker keep the Horus price and an unknown (unfiltered) volume.
+        snap = self.tickers.snapshot() if self.tickers is not None else {}
+        for symbol_pair, _ in self.universe:
+            t = snap.get(symbol_pair)
+            if t is None:
+                continue
+            if use_prices and t.last > 0:
+                prices[symbol_pair] = t.last
+            liquidity[symbol_pair] = t.volume_24h
 
-    strat_mgr = StrategyManager(allow_short=config.ALLOW_SHORT)
-    target_weights = strat_mgr.combine(data_handler, prices, liquidity)
-    logger.info("target_weights: %s", target_weights)
+    def valuation_prices(self, prices: dict[str, float]) -> dict[str, float]:
+        # holdings outside the universe are valued at their ticker price instead of 0
+        if self.tickers is None:
+            return prices
+        return {**self.tickers.last_prices(), **prices}
 
-    if not target_weights:
-        logger.info("no target weights, skip rebalance this run")
-        return
-    
-    ex_client = ExchangeClient()
-    positions, equity, usd_free = ex_client.get_positions_and_equity(prices)
+    def apply_rows(self, rows_by_pair: Dict[str, PriceSeries]) -> tuple[dict[str, float], dict[str, float]]:
+        today_utc_str = self.clock.now().strftime("%Y-%m-%d")
 
-    logger.info("current positions: %s, equity=%.2f, cash=%.2f", positions, equity, usd_free)
+        data_handler = self.data_handler
+        prices: dict[str, float] = {}
+        liquidity: dict[str, float] = {}
 
-    log_equity_snapshot(equity, usd_free)
+        for symbol_pair, internal_symbol in self.universe:
+            series = rows_by_pair.get(symbol_pair) or PriceSeries.empty()
+            logger.info("[horus] %s->%s n=%d", symbol_pair, internal_symbol, len(series))
 
-    orders = calc_rebalance_orders(
-        current_positions=positions,
-        prices=prices,
-        target_weights=target_weights,
-        total_equity=equity,
-        min_notional=getattr(config, "MIN_NOTIONAL", 0.1),
-    )
+            if not series:
+                logger.info("[horus] no rows for %s %s", symbol_pair, today_utc_str)
+                continue
 
-    if not orders:
-        logger.info("no rebalance orders; portfolio already aligned with target")
-        return
+            with self.timer.stage("emit"):
+                try:
+                    process_and_emit(
+                        internal_symbol, series, today_utc_str, fallback_last_n=20, sink=self.sink
+                    )
+                except Exception as e:
+                    logger.exception("emit csv failed for %s: %s", internal_symbol, e)
+
+            with self.timer.stage("update"):
+                data_handler.update_series(symbol_pair, series)
+            last_price = series.last_price
+            prices[symbol_pair] = last_price
+            liquidity[symbol_pair] = UNKNOWN_LIQUIDITY
+
+        return prices, liquidity
+
+    def evaluate(self, prices: dict[str, float], liquidity: dict[str, float]) -> None:
+        target_weights = self.compute_weights(prices, liquidity)
+        if not target_weights:
+            return
+
+        valued = self.valuation_prices(prices)
+        with self.timer.stage("positions"):
+            positions, equity, usd_free = self.exchange_client.get_positions_and_equity(valued)
+        self.held = set(positions)
+
+        orders = self.plan_orders(target_weights, valued, positions, equity, usd_free)
+        if orders:
+            self.send_orders(orders)
+
+    def compute_weights(self, prices: dict[str, float], liquidity: dict[str, float]) -> dict:
+        with self.timer.stage("strategies"):
+            target_weights = self.strategy_manager.combine(self.data_handler, prices, liquidity, clock=self.clock)
+        logger.info("target_weights: %s", target_weights)
+
+        if not target_weights:
+            logger.info("no target weights, skip rebalance this run")
+        return target_weights
+
+    def plan_orders(self, target_weights: dict, prices: dict[str, float], positions: dict[str, float],
+                    equity: float, usd_free: float) -> list[dict]:
+        logger.info("current positions: %s, equity=%.2f, cash=%.2f", positions, equity, usd_free)
+
+        if self.live:
+            log_equity_snapshot(equity, usd_free)
+
+        with self.timer.stage("rebalance"):
+            orders = calc_rebalance_orders(
+                current_positions=positions,
+                prices=prices,
+                target_weights=target_weights,
+                total_equity=equity,
+                min_notional=getattr(config, "MIN_NOTIONAL", 0.1),
+                rules=self.exchange_info.rules() if self.exchange_info is not None else self.offline_rules,
+            )
+
+        if not orders:
+            logger.info("no rebalance orders; portfolio already aligned with target")
+            return []
+
+        logger.info("proposed orders: %s", orders)
+        return orders
+
+    def send_orders(self, orders: list[dict]) -> None:
+        # offline runs always fill against their simulated exchange
+        if self.live and getattr(config, "DRY_RUN", True):
+            logger.info("[DRY_RUN] skip sending orders")
+            return
+        with self.timer.stage("orders"):
+            execute_orders(self.exchange_client, orders, retry=1, trade_log=self.live)
+        self.timer.mark("signal_to_order")
+
+    def run_stream(self, feed) -> int:
+        # streaming mode: ticks build 5m bars in the data handler and strategies are evaluated
+        # once per closed bar period instead of on a timer. Returns the number of evaluations.
+        if not self.started:
+            self.start()
+        data_handler = self.data_handler
+        pairs = {symbol_pair for symbol_pair, _ in self.universe}
+        grace_ms = int(getattr(config, "STREAM_CLOSE_GRACE_SEC", 5) * 1000)
+        prices: dict[str, float] = {}
+        liquidity: dict[str, float] = {}
+        for pair in pairs:
+            last = data_handler.series(pair).last_price
+            if last is not None:
+                prices[pair] = last
+                liquidity[pair] = UNKNOWN_LIQUIDITY
+        sim = self.exchange_client if isinstance(self.exchange_client, SimExchange) else None
+        if sim is not None:
+            # fills at the replayed prices
+            sim.prices = prices
+        evals = 0
+        try:
+            for item in feed.ticks():
+                if item is not None:
+                    pair, ts_ms, px = item
+                    if pair not in pairs:
+                        continue
+                    data_handler.on_tick(pair, ts_ms, px)
+                    prices[pair] = px
+                    liquidity[pair] = UNKNOWN_LIQUIDITY
+                now_ms = self.clock.now_ms()
+                if not data_handler.bars_ready(now_ms, grace_ms):
+                    continue
+                if not data_handler.closed_is_live(now_ms, grace_ms):
+                    # backfilled history: keep the bars, evaluate only closes seen in real time
+                    data_handler.clear_closed()
+                    continue
+                closed = sorted(data_handler.closed_bars())
+                logger.info("[stream] bar close %s", closed)
+                self.timer = StageTimer()
+                if sim is not None:
+                    sim.clock_ms = now_ms
+                try:
+                    if self.tickers is not None:
+                        # live ticks already carry the price; the ticker adds 24h volume
+                        with self.timer.stage("tickers"):
+                            self.tickers.refresh()
+                        self.apply_tickers(prices, liquidity, use_prices=False)
+                    self.evaluate(prices, liquidity)
+                except Exception:
+                    logger.exception("evaluate failed")
+                finally:
+                    data_handler.clear_closed()
+                    with self.timer.stage("snapshot"):
+                        self.save_snapshot()
+                    logger.info("[cycle] %s", self.timer.finish())
+                evals += 1
+        finally:
+            feed.close()
+        return evals
+
+
+class AsyncTradingEngine(TradingEngine):
+    # asyncio cycle over the same components: the balance request is started together with the
+    # Horus pull instead of after it, and orders go out as soon as weights and balance are known
+    def start(self) -> None:
+        super().start()
+        self.ahorus = AsyncHorusClient(self.horus_client)
+        self.aexchange = AsyncExchangeClient(self.exchange_client)
+
+    async def fetch_price_rows_async(self) -> Dict[str, PriceSeries]:
+        end = self.clock.now()
+        lookback_hours = self.needs.lookback_hours
+        pairs = [symbol_pair for symbol_pair, _ in self.universe]
+        if not pairs:
+            return {}
+        results, errors = await self.ahorus.fetch_incremental(pairs, timedelta(hours=lookback_hours), end)
+        for pair, err in errors.items():
+            logger.warning("[horus] fetch failed for %s: %s", pair, err)
+        return results
+
+    async def tick_async(self, event: FireEvent | None = None) -> None:
+        if not self.started:
+            self.start()
+        self.timer = StageTimer()
+        try:
+            await self._tick_async()
+        finally:
+            with self.timer.stage("snapshot"):
+                await asyncio.to_thread(self.save_snapshot)
+            late = f" late={event.late_ms}ms" if event is not None else ""
+            logger.info("[cycle]%s %s", late, self.timer.finish())
+
+    async def _tick_async(self) -> None:
+        balance = asyncio.create_task(self.aexchange.get_balance_raw())
+        tickers = asyncio.create_task(self.tickers.refresh_async()) if self.tickers is not None else None
+        try:
+            if tickers is not None and self.selector is not None and self.selector.due():
+                # the ranking needs this cycle's tickers before deciding what to fetch
+                with self.timer.stage("universe"):
+                    await tickers
+                    self.refresh_universe()
+            with self.timer.stage("fetch"):
+                rows_by_pair = await self.fetch_price_rows_async()
+            prices, liquidity = self.apply_rows(rows_by_pair)
+            if tickers is not None:
+                with self.timer.stage("tickers"):
+                    await tickers
+                self.apply_tickers(prices, liquidity)
+
+            target_weights = self.compute_weights(prices, liquidity)
+            if not target_weights:
+                return
+
+            # normally already resolved; this only waits if the balance call is slower than Horus
+            with self.timer.stage("positions"):
+                bal = await balance
+            valued = self.valuation_prices(prices)
+            positions, equity, usd_free = self.exchange_client.positions_from_balance(bal, valued)
+            self.held = set(positions)
+
+            orders = self.plan_orders(target_weights, valued, positions, equity, usd_free)
+            if orders:
+                await self.send_orders_async(orders)
+        finally:
+            if not balance.done():
+                balance.cancel()
+            elif not balance.cancelled():
+                balance.exception()  # retrieved so an unused failure is not reported as unhandled
+            if tickers is not None and not tickers.done():
+                tickers.cancel()
+
+    async def send_orders_async(self, orders: list[dict]) -> None:
+        if getattr(config, "DRY_RUN", True):
+            logger.info("[DRY_RUN] skip sending orders")
+            return
+        with self.timer.stage("orders"):
+            await execute_orders_async(self.exchange_client, orders, retry=1)
+        self.timer.mark("signal_to_order")
+
+
+_engine: TradingEngine | None = None
 
-    logger.info("proposed orders: %s", orders)
 
-    if getattr(config, "DRY_RUN", True):
-        logger.info("[DRY_RUN] skip sending orders")
+def run_once():
+    global _engine
+    if _engine is None:
+        _engine = TradingEngine()
+        _engine.start()
+    _engine.tick()
+
+
+def main_stream():
+    kind = getattr(config, "STREAM_FEED", "horus")
+    if kind == "replay":
+        # replay drives its own simulated clock from the recorded timestamps and trades against a
+        # simulated exchange, isolated from the live snapshot, store, logs and account
+        engine = TradingEngine(
+            exchange_client=SimExchange(
+                cash=getattr(config, "BACKTEST_INITIAL_CASH", 50_000.0),
+                fee_rate=getattr(config, "BACKTEST_FEE_RATE", 0.001),
+            ),
+            clock=SimClock(),
+            live=False,
+        )
     else:
-        execute_orders(ex_client, orders, retry=1)
+        engine = TradingEngine()
+    engine.start()
+    feed = make_feed(kind, engine)
+    logger.info(f"Starting stream loop, feed={kind}, DRY_RUN={getattr(config, 'DRY_RUN', True) and engine.live}")
+    try:
+        evals = engine.run_stream(feed)
+    finally:
+        engine.shutdown()
+    if not engine.live:
+        ex = engine.exchange_client
+        _, equity, cash = ex.get_positions_and_equity(ex.prices)
+        logger.info(f"replay done: evals={evals} trades={ex.trades} rejected={ex.rejected} "
+                    f"equity={equity:.2f} cash={cash:.2f}")
+
+
+async def main_async():
+    interval_sec = getattr(config, "LOOP_INTERVAL_SEC", getattr(config, "ORDER_INTERVAL_SEC", 60))
+    logger.info(f"Starting async loop, interval={interval_sec} sec, DRY_RUN={getattr(config, 'DRY_RUN', True)}")
+    engine = AsyncTradingEngine()
+    engine.start()
+    scheduler = Scheduler(period_sec=interval_sec, clock=engine.clock)
+    try:
+        if getattr(config, "SCHEDULER_RUN_AT_START", True):
+            try:
+                await engine.tick_async()
+            except Exception:
+                logger.exception("run_once failed")
+        while True:
+            event = await scheduler.wait_async()
+            if event is None:
+                break
+            logger.info("[sched] fire %s", event)
+            try:
+                await engine.tick_async(event)
+            except Exception:
+                logger.exception("run_once failed")
+    finally:
+        engine.shutdown()
+
 
 def main_loop():
     interval_sec = getattr(config, "LOOP_INTERVAL_SEC", getattr(config, "ORDER_INTERVAL_SEC", 60))
     logger.info(f"Starting main loop, interval={interval_sec} sec, DRY_RUN={getattr(config, 'DRY_RUN', True)}")
-    while True:
-        try:
-            run_once()
-        except Exception:
-            logger.exception("run_once failed")
-        time.sleep(interval_sec)
+    engine = TradingEngine()
+    engine.start()
+    scheduler = Scheduler(period_sec=interval_sec, clock=engine.clock)
+    try:
+        if getattr(config, "SCHEDULER_RUN_AT_START", True):
+            try:
+                engine.tick()
+            except Exception:
+                logger.exception("run_once failed")
+        while True:
+            event = scheduler.wait()
+            if event is None:
+                break
+            logger.info("[sched] fire %s", event)
+            try:
+                engine.tick(event)
+            except Exception:
+                logger.exception("run_once failed")
+    finally:
+        engine.shutdown()
 
 
 if __name__ == "__main__":
-    main_loop()
+    if getattr(config, "INGEST_MODE", "poll") == "stream":
+        main_stream()
+    elif getattr(config, "ASYNC_LOOP", False):
+        asyncio.run(main_async())
+    else:
+        main_loop()
@@ -0,0 +1,205 @@
+# metrics.py
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+# process-wide counters and latency histograms (ms). With METRICS_ENABLED off every call is one
+# flag check: inc/observe return at once. Callers time with perf_counter themselves (StageTimer
+# needs the stage times for the cycle log line either way).
+
+PREFIX = "roostoo_"
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_enabled = bool(getattr(config, "METRICS_ENABLED", True))
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, v)] += 1
+        self.sum += v
+        self.count += 1
+
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())) if labels else ())
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[tuple, float] = {}
+        self.histograms: dict[tuple, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1.0, labels: dict | None = None) -> None:
+        k = _key(name, labels)
+        with self._lock:
+            self.counters[k] = self.counters.get(k, 0.0) + value
+
+    def observe(self, name: str, value_ms: float, labels: dict | None = None) -> None:
+        k = _key(name, labels)
+        with self._lock:
+            h = self.histograms.get(k)
+            if h is None:
+                h = self.histograms[k] = Histogram()
+            h.observe(value_ms)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self.counters.items())
+            hists = sorted(((k, (list(h.counts), h.sum, h.count)) for k, h in self.histograms.items()))
+        lines: list[str] = []
+        typed: set[str] = set()
+        for (name, labels), v in counters:
+            full = PREFIX + name
+            if full not in typed:
+                lines.append(f"# TYPE {full} counter")
+                typed.add(full)
+            lines.append(f"{full}{_fmt_labels(labels)} {v:g}")
+        for (name, labels), (counts, total, n) in hists:
+            full = PREFIX + name
+            if full not in typed:
+                lines.append(f"# TYPE {full} histogram")
+                typed.add(full)
+            cum = 0
+            for bound, c in zip(BUCKETS_MS + (float("inf"),), counts):
+                cum += c
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{full}_bucket{_fmt_labels(labels + (('le', le),))} {cum}")
+            lines.append(f"{full}_sum{_fmt_labels(labels)} {total:.3f}")
+            lines.append(f"{full}_count{_fmt_labels(labels)} {n}")
+        return "\n".join(lines) + "\n"
+
+
+def _fmt_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + body + "}"
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def configure(enabled: bool) -> None:
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    if _enabled:
+        REGISTRY.inc(name, value, labels)
+
+
+def observe(name: str, value_ms: float, **labels) -> None:
+    if _enabled:
+        REGISTRY.observe(name, value_ms, labels)
+
+
+def render() -> str:
+    return REGISTRY.render_prometheus()
+
+
+def dump(path: str) -> None:
+    # written whole and renamed so a scraper tailing the file never sees a partial dump
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Exporter:
+    # periodic file dump and/or a /metrics endpoint on localhost
+    def __init__(self, path: str | None = None, port: int | None = None, interval_sec: float | None = None):
+        self.path = path
+        self.port = port
+        self.interval_sec = float(interval_sec or getattr(config, "METRICS_DUMP_SEC", 60))
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._server: ThreadingHTTPServer | None = None
+
+    def start(self) -> "Exporter":
+        if self.path:
+            self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+            self._thread.start()
+        if self.port:
+            self._server = ThreadingHTTPServer(("127.0.0.1", int(self.port)), _Handler)
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            logging.info(f"[metrics] serving http://127.0.0.1:{self.port}/metrics")
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            self._dump()
+
+    def _dump(self) -> None:
+        try:
+            dump(self.path)
+        except Exception as e:
+            logging.error(f"[metrics] dump failed: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._dump()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def start_exporter() -> Exporter | None:
+    if not _enabled:
+        return None
+    path = getattr(config, "METRICS_FILE", None)
+    port = getattr(config, "METRICS_PORT", None)
+    if not path and not port:
+        return None
+    return Exporter(path=path, port=port).start()
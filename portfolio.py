@@ -3,13 +3,23 @@ def calc_rebalance_orders(current_positions: dict[str, float],
                           prices: dict[str, float],
                           target_weights: dict[str, float],
                           total_equity: float,
-                          min_notional: float = 5.0) -> list[dict]:
+                          min_notional: float = 5.0,
+                          rules: dict | None = None) -> list[dict]:
 
     orders: list[dict] = []
+    rules = {} if rules is None else rules
 
     to_clear = set(current_positions.keys()) - set(target_weights.keys())
     for s in to_clear:
         qty = current_positions.get(s, 0.0)
+        rule = rules.get(s)
+        if rule is not None:
+            if not rule.can_trade:
+                continue
+            qty = rule.floor_qty(qty)
+            price = prices.get(s)
+            if price and qty * price < rule.min_order:
+                continue
         if qty > 0:
             orders.append({"symbol": s, "side": "sell", "qty": qty})
 
@@ -17,25 +27,34 @@ def calc_rebalance_orders(current_positions: dict[str, float],
         price = prices.get(s)
         if not price:
             continue
+        rule = rules.get(s)
+        if rule is not None and not rule.can_trade:
+            continue
         target_val = w * total_equity
         cur_qty = current_positions.get(s, 0.0)
         cur_val = cur_qty * price
         diff_val = target_val - cur_val
 
-        if abs(diff_val) < min_notional:
+        floor_val = max(min_notional, rule.min_order) if rule is not None else min_notional
+        if abs(diff_val) < floor_val:
             continue
 
         side = "buy" if diff_val > 0 else "sell"
         qty = abs(diff_val) / price
 
-        qty_int = int(qty)
-        if qty_int <= 0:
-            continue
+        if rule is None:
+            qty = int(qty)
+            if qty <= 0:
+                continue
+        else:
+            qty = rule.floor_qty(qty)
+            if qty <= 0 or qty * price < rule.min_order:
+                continue
 
         orders.append({
             "symbol": s,
             "side": side,
-            "qty": qty_int,
+            "qty": qty,
         })
 
     return orders
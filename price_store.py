@@ -0,0 +1,198 @@
+# price_store.py
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+
+import config
+from series import PriceSeries
+
+# one fixed-size little-endian record per bar; segment files are raw arrays of these so they
+# can be memory-mapped directly
+RECORD = np.dtype([("ts", "<i8"), ("px", "<f8")])
+
+
+def _segment_name(ts_ms: int) -> str:
+    t = time.gmtime(ts_ms / 1000.0)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}.bin"
+
+
+def _segment_bounds(name: str) -> tuple[int, int]:
+    year, month = int(name[:4]), int(name[5:7])
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    end = datetime(year + (month == 12), month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+
+class PriceStore:
+    # append-only bar store: <root>/<interval>/<ASSET>/<YYYY-MM>.bin, sorted by ts within and
+    # across segments. Reads are memory-mapped; a torn trailing record is ignored on read and
+    # truncated on the next append.
+    def __init__(self, root: str | None = None):
+        self.root = root or getattr(config, "PRICE_STORE_DIR", "data/store")
+        self._lock = threading.Lock()
+        self._last_ts: dict[tuple[str, str], int | None] = {}
+
+    def _dir(self, asset: str, interval: str) -> str:
+        return os.path.join(self.root, interval, asset.upper())
+
+    def assets(self, interval: str) -> list[str]:
+        d = os.path.join(self.root, interval)
+        if not os.path.isdir(d):
+            return []
+        return sorted(a for a in os.listdir(d) if os.path.isdir(os.path.join(d, a)))
+
+    def segments(self, asset: str, interval: str) -> list[str]:
+        d = self._dir(asset, interval)
+        if not os.path.isdir(d):
+            return []
+        return sorted(os.path.join(d, f) for f in os.listdir(d) if f.endswith(".bin"))
+
+    @staticmethod
+    def _map(path: str) -> np.ndarray:
+        n = os.path.getsize(path) // RECORD.itemsize
+        if n == 0:
+            return np.empty(0, dtype=RECORD)
+        return np.memmap(path, dtype=RECORD, mode="r", shape=(n,))
+
+    def last_ts(self, asset: str, interval: str) -> int | None:
+        key = (asset.upper(), interval)
+        if key not in self._last_ts:
+            last = None
+            for path in reversed(self.segments(asset, interval)):
+                recs = self._map(path)
+                if len(recs):
+                    last = int(recs["ts"][-1])
+                    break
+            self._last_ts[key] = last
+        return self._last_ts[key]
+
+    def append(self, asset: str, interval: str, series: PriceSeries) -> int:
+        # rows at or before the stored high-water mark are dropped, except that a revised
+        # price for the very last stored bar overwrites it in place
+        if not len(series):
+            return 0
+        with self._lock:
+            last = self.last_ts(asset, interval)
+            if last is not None:
+                if series.ts[-1] < last:
+                    return 0
+                hit = np.flatnonzero(series.ts == last)
+                if len(hit):
+                    self._overwrite_last(asset, interval, last, float(series.px[hit[-1]]))
+                series = series.after(last)
+            if not len(series):
+                return 0
+
+            d = self._dir(asset, interval)
+            os.makedirs(d, exist_ok=True)
+            recs = np.empty(len(series), dtype=RECORD)
+            recs["ts"] = series.ts
+            recs["px"] = series.px
+            first = _segment_name(int(series.ts[0]))
+            if first == _segment_name(int(series.ts[-1])):
+                chunks = [(first, recs)]
+            else:
+                names = [_segment_name(t) for t in series.ts.tolist()]
+                chunks = []
+                a = 0
+                for i in range(1, len(names) + 1):
+                    if i == len(names) or names[i] != names[a]:
+                        chunks.append((names[a], recs[a:i]))
+                        a = i
+            for name, chunk in chunks:
+                path = os.path.join(d, name)
+                with open(path, "ab") as f:
+                    torn = f.tell() % RECORD.itemsize
+                    if torn:
+                        f.truncate(f.tell() - torn)
+                        f.seek(0, os.SEEK_END)
+                    f.write(chunk.tobytes())
+            self._last_ts[(asset.upper(), interval)] = int(series.ts[-1])
+            return len(series)
+
+    def _overwrite_last(self, asset: str, interval: str, last: int, px: float) -> None:
+        path = os.path.join(self._dir(asset, interval), _segment_name(last))
+        n = os.path.getsize(path) // RECORD.itemsize
+        if n == 0:
+            return
+        with open(path, "r+b") as f:
+            f.seek((n - 1) * RECORD.itemsize)
+            rec = np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)
+            if int(rec["ts"][0]) != last or float(rec["px"][0]) == px:
+                return
+            f.seek((n - 1) * RECORD.itemsize)
+            f.write(np.array([(last, px)], dtype=RECORD).tobytes())
+
+    def read(self, asset: str, interval: str, start_ms: int | None = None, end_ms: int | None = None) -> PriceSeries:
+        parts = []
+        for path in self.segments(asset, interval):
+            seg_start, seg_end = _segment_bounds(os.path.basename(path))
+            if start_ms is not None and seg_end <= start_ms:
+                continue
+            if end_ms is not None and seg_start >= end_ms:
+                continue
+            recs = self._map(path)
+            if not len(recs):
+                continue
+            ts = recs["ts"]
+            lo = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+            hi = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="left"))
+            if hi > lo:
+                parts.append(recs[lo:hi])
+        if not parts:
+            return PriceSeries.empty()
+        if len(parts) == 1:
+            # field views straight into the mapping, no copy
+            return PriceSeries(parts[0]["ts"], parts[0]["px"])
+        return PriceSeries(
+            np.concatenate([p["ts"] for p in parts]),
+            np.concatenate([p["px"] for p in parts]),
+        )
+
+
+def backfill(store: PriceStore, client, assets: list[str], start_utc: datetime, end_utc: datetime,
+             chunk: timedelta = timedelta(days=1)) -> dict[str, int]:
+    # pull history from Horus in chunks; the client writes through to the store
+    client.store = store
+    written: dict[str, int] = {}
+    for asset in assets:
+        pair = f"{asset}/USD"
+        last = store.last_ts(asset, client.interval_val)
+        t = start_utc
+        if last is not None:
+            t = max(t, datetime.fromtimestamp(last / 1000.0, tz=timezone.utc))
+        n = 0
+        while t < end_utc:
+            t_end = min(t + chunk, end_utc)
+            n += len(client.fetch_range_prices(pair, t, t_end))
+            t = t_end
+        written[asset] = n
+        logging.info(f"[store] backfilled {asset} rows={n}")
+    return written
+
+
+def main():
+    from horus_client import HorusClient, SUPPORTED_ASSETS
+
+    ap = argparse.ArgumentParser(description="backfill the local price store from Horus")
+    ap.add_argument("--days", type=float, default=30)
+    ap.add_argument("--assets", default=None, help="comma separated, default: all supported assets")
+    ap.add_argument("--root", default=None)
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    store = PriceStore(args.root)
+    client = HorusClient()
+    client.debug = False
+    assets = args.assets.split(",") if args.assets else sorted(SUPPORTED_ASSETS)
+    end = datetime.now(timezone.utc)
+    backfill(store, client, assets, end - timedelta(days=args.days), end)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# scheduler.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import config
+import metrics
+from clock import NY_TZ, SystemClock
+
+
+class FireEvent:
+    __slots__ = ("scheduled_ms", "kind", "late_ms", "skipped")
+
+    def __init__(self, scheduled_ms: int, kind: str, late_ms: int, skipped: int):
+        self.scheduled_ms = scheduled_ms
+        self.kind = kind          # "bar" or "session"
+        self.late_ms = late_ms    # how far past scheduled_ms we actually woke up
+        self.skipped = skipped    # boundaries that passed while the previous cycle was running
+
+    def __repr__(self) -> str:
+        return f"FireEvent({self.kind}, scheduled={self.scheduled_ms}, late={self.late_ms}ms, skipped={self.skipped})"
+
+
+class Scheduler:
+    # fires on absolute wall-clock boundaries (every period_sec, plus NY session times such as the
+    # 04:00 first-4h close) shifted by offset_sec. Targets are computed from the clock each time,
+    # never by sleeping a fixed interval, so cycle duration does not accumulate as drift. If a
+    # cycle overruns one or more boundaries, those are skipped (not replayed back to back).
+    def __init__(
+        self,
+        period_sec: float | None = None,
+        offset_sec: float | None = None,
+        session_times_ny: list[str] | None = None,
+        clock=None,
+        sleep=None,
+    ):
+        self.period_ms = int((period_sec or getattr(config, "LOOP_INTERVAL_SEC", 300)) * 1000)
+        offset = getattr(config, "SCHEDULER_OFFSET_SEC", 2.0) if offset_sec is None else offset_sec
+        self.offset_ms = int(offset * 1000)
+        if session_times_ny is None:
+            session_times_ny = getattr(config, "SCHEDULER_SESSION_TIMES_NY", ["04:00"])
+        self.session_times = [tuple(int(x) for x in t.split(":")) for t in session_times_ny]
+        self.clock = clock or SystemClock()
+        self._stop = threading.Event()
+        self._sleep = sleep or self._stop.wait
+        self._last_ms: int | None = None
+
+    def _next_bar_ms(self, now_ms: int) -> int:
+        base = now_ms - self.offset_ms
+        return (base // self.period_ms + 1) * self.period_ms + self.offset_ms
+
+    def _next_session_ms(self, now_ms: int) -> int | None:
+        if not self.session_times:
+            return None
+        ny = datetime.fromtimestamp((now_ms - self.offset_ms) / 1000.0, tz=NY_TZ)
+        best = None
+        for day in (ny.date(), ny.date() + timedelta(days=1)):
+            for hh, mm in self.session_times:
+                t = int(datetime(day.year, day.month, day.day, hh, mm, tzinfo=NY_TZ).timestamp() * 1000)
+                t += self.offset_ms
+                if t > now_ms and (best is None or t < best):
+                    best = t
+        return best
+
+    def next_fire(self, now_ms: int) -> tuple[int, str]:
+        bar = self._next_bar_ms(now_ms)
+        sess = self._next_session_ms(now_ms)
+        if sess is not None and sess <= bar:
+            return sess, "session"
+        return bar, "bar"
+
+    def _plan(self) -> tuple[int, str, int]:
+        now = self.clock.now_ms()
+        skipped = 0
+        if self._last_ms is not None:
+            missed = self._next_bar_ms(self._last_ms)
+            if now >= missed:
+                skipped = int((now - missed) // self.period_ms) + 1
+                logging.warning(f"[sched] cycle overran, skipping {skipped} missed boundary(s)")
+        target, kind = self.next_fire(now)
+        return target, kind, skipped
+
+    def _fired(self, target: int, kind: str, skipped: int) -> FireEvent | None:
+        if self._stop.is_set():
+            return None
+        self._last_ms = target
+        late = self.clock.now_ms() - target
+        metrics.observe("scheduler_late_ms", late)
+        if skipped:
+            metrics.inc("scheduler_skipped_total", skipped)
+        return FireEvent(target, kind, late, skipped)
+
+    def wait(self) -> FireEvent | None:
+        # blocks until the next boundary; None if stop() was called meanwhile
+        target, kind, skipped = self._plan()
+        while not self._stop.is_set():
+            left = target - self.clock.now_ms()
+            if left <= 0:
+                break
+            # sleep in bounded slices so a wall-clock step (NTP, suspend) is picked up quickly
+            self._sleep(min(left, 30_000) / 1000.0)
+        return self._fired(target, kind, skipped)
+
+    async def wait_async(self) -> FireEvent | None:
+        target, kind, skipped = self._plan()
+        while not self._stop.is_set():
+            left = target - self.clock.now_ms()
+            if left <= 0:
+                break
+            await asyncio.sleep(min(left, 30_000) / 1000.0)
+        return self._fired(target, kind, skipped)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class StageTimer:
+    # per-cycle wall time of each named stage, in ms
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            self.stages[name] = self.stages.get(name, 0.0) + ms
+            metrics.observe("cycle_stage_ms", ms, stage=name)
+
+    def mark(self, name: str) -> None:
+        # elapsed since the timer was created, e.g. scheduled-fire -> orders sent
+        self.stages[name] = (time.perf_counter() - self._t0) * 1000.0
+        metrics.observe(f"{name}_ms", self.stages[name])
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000.0
+
+    def finish(self) -> str:
+        # closes the cycle: records its total and returns the one-line summary for the log
+        metrics.observe("cycle_ms", self.total_ms())
+        metrics.inc("cycles_total")
+        return self.summary()
+
+    def summary(self) -> str:
+        parts = " ".join(f"{k}={v:.1f}" for k, v in self.stages.items())
+        return f"{parts} total={self.total_ms():.1f}ms"
@@ -0,0 +1,85 @@
+# series.py
+from __future__ import annotations
+
+import numpy as np
+
+
+class PriceSeries:
+    # struct-of-arrays price history: int64 epoch-ms timestamps + float64 prices, sorted by ts.
+    # Slicing methods return views, so passing a series along never copies the data.
+    __slots__ = ("ts", "px")
+
+    def __init__(self, ts: np.ndarray, px: np.ndarray):
+        self.ts = ts
+        self.px = px
+
+    @classmethod
+    def empty(cls) -> "PriceSeries":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+    @classmethod
+    def from_unsorted(cls, ts: np.ndarray, px: np.ndarray) -> "PriceSeries":
+        # sorts by ts and drops duplicate timestamps, keeping the last price seen for each
+        ts = np.asarray(ts, dtype=np.int64)
+        px = np.asarray(px, dtype=np.float64)
+        if len(ts) == 0:
+            return cls.empty()
+        order = np.argsort(ts, kind="stable")
+        ts, px = ts[order], px[order]
+        keep = np.empty(len(ts), dtype=bool)
+        keep[:-1] = ts[1:] != ts[:-1]
+        keep[-1] = True
+        if keep.all():
+            return cls(ts, px)
+        return cls(ts[keep], px[keep])
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __bool__(self) -> bool:
+        return len(self.ts) > 0
+
+    def __repr__(self) -> str:
+        if not len(self):
+            return "PriceSeries(n=0)"
+        return f"PriceSeries(n={len(self)}, ts=[{self.ts[0]}..{self.ts[-1]}], last={self.px[-1]})"
+
+    @property
+    def last_ts(self) -> int | None:
+        return int(self.ts[-1]) if len(self.ts) else None
+
+    @property
+    def last_price(self) -> float | None:
+        return float(self.px[-1]) if len(self.px) else None
+
+    def between(self, start_ms: int, end_ms: int) -> "PriceSeries":
+        lo = int(np.searchsorted(self.ts, start_ms, side="left"))
+        hi = int(np.searchsorted(self.ts, end_ms, side="left"))
+        return PriceSeries(self.ts[lo:hi], self.px[lo:hi])
+
+    def since(self, start_ms: int) -> "PriceSeries":
+        lo = int(np.searchsorted(self.ts, start_ms, side="left"))
+        return PriceSeries(self.ts[lo:], self.px[lo:])
+
+    def after(self, ts_ms: int) -> "PriceSeries":
+        lo = int(np.searchsorted(self.ts, ts_ms, side="right"))
+        return PriceSeries(self.ts[lo:], self.px[lo:])
+
+    def tail(self, n: int) -> "PriceSeries":
+        if n <= 0:
+            return PriceSeries.empty()
+        return PriceSeries(self.ts[-n:], self.px[-n:])
+
+    def merge(self, newer: "PriceSeries") -> "PriceSeries":
+        # newer wins on equal timestamps; the common case (newer overlaps our tail) is a
+        # searchsorted + one concatenate
+        if not len(newer):
+            return self
+        if not len(self):
+            return newer
+        if newer.ts[-1] >= self.ts[-1]:
+            head = self.between(int(self.ts[0]), int(newer.ts[0]))
+            return PriceSeries(np.concatenate((head.ts, newer.ts)), np.concatenate((head.px, newer.px)))
+        return PriceSeries.from_unsorted(
+            np.concatenate((self.ts, newer.ts)), np.concatenate((self.px, newer.px))
+        )
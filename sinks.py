@@ -0,0 +1,111 @@
+# sinks.py
+from __future__ import annotations
+
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+import config
+from series import PriceSeries
+
+# Destinations for the per-cycle price rows. Each sink remembers the last ts it emitted per symbol,
+# so a cycle only writes bars that are new since the previous one (one write call per symbol).
+
+
+def _ms_to_iso8601_utc(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000.0, tz=timezone.utc).isoformat()
+
+
+def format_rows_csv(symbol: str, series: PriceSeries) -> str:
+    return "".join(
+        f"{symbol},{_ms_to_iso8601_utc(ts_ms)},{price}\n"
+        for ts_ms, price in zip(series.ts.tolist(), series.px.tolist())
+    )
+
+
+class RowSink:
+    def __init__(self):
+        self.last_ts: dict[str, int] = {}
+
+    def new_rows(self, symbol: str, series: PriceSeries) -> PriceSeries | None:
+        # None until this symbol has been emitted once (caller picks the initial window)
+        last = self.last_ts.get(symbol)
+        if last is None:
+            return None
+        return series.after(last)
+
+    def emit(self, symbol: str, series: PriceSeries) -> int:
+        if not series:
+            return 0
+        self._write(symbol, series)
+        last = series.last_ts
+        if last > self.last_ts.get(symbol, last - 1):
+            self.last_ts[symbol] = last
+        return len(series)
+
+    def _write(self, symbol: str, series: PriceSeries) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(RowSink):
+    def _write(self, symbol: str, series: PriceSeries) -> None:
+        pass
+
+
+class StdoutSink(RowSink):
+    def __init__(self, stream=None):
+        super().__init__()
+        self.stream = stream or sys.stdout
+
+    def _write(self, symbol: str, series: PriceSeries) -> None:
+        self.stream.write(format_rows_csv(symbol, series))
+        self.stream.flush()
+
+
+class FileSink(RowSink):
+    def __init__(self, path: str | None = None):
+        super().__init__()
+        self.path = path or getattr(config, "EMIT_FILE", "logs/prices.csv")
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.f = open(self.path, "a", encoding="utf-8")
+
+    def _write(self, symbol: str, series: PriceSeries) -> None:
+        self.f.write(format_rows_csv(symbol, series))
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class StoreSink(RowSink):
+    # binary rows into the local price store, no text formatting at all
+    def __init__(self, store, interval: str):
+        super().__init__()
+        self.store = store
+        self.interval = interval
+
+    def _write(self, symbol: str, series: PriceSeries) -> None:
+        self.store.append(symbol, self.interval, series)
+
+
+def make_sink(kind: str | None = None, store=None, interval: str | None = None) -> RowSink:
+    kind = (kind or getattr(config, "EMIT_SINK", "stdout") or "none").lower()
+    if kind == "none":
+        return NullSink()
+    if kind == "stdout":
+        return StdoutSink()
+    if kind == "file":
+        return FileSink()
+    if kind == "store":
+        if store is None:
+            from price_store import PriceStore
+            store = PriceStore()
+        return StoreSink(store, interval or getattr(config, "HORUS_INTERVAL", "15m"))
+    logging.warning(f"[emit] unknown sink {kind!r}, rows are not emitted")
+    return NullSink()
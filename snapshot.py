@@ -0,0 +1,40 @@
+# snapshot.py
+import logging
+import os
+import pickle
+import time
+
+SNAPSHOT_VERSION = 1
+
+
+def save_snapshot(path: str, state: dict) -> int:
+    # atomic: write a sibling temp file, fsync, then rename over the old snapshot
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    payload = {"version": SNAPSHOT_VERSION, "saved_ms": int(time.time() * 1000), "state": state}
+    blob = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(blob)
+
+
+def load_snapshot(path: str) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        logging.error(f"[snapshot] unreadable snapshot {path}: {e}")
+        return None
+    if not isinstance(payload, dict) or payload.get("version") != SNAPSHOT_VERSION:
+        logging.warning(f"[snapshot] ignoring snapshot {path} with unknown version")
+        return None
+    age_sec = (time.time() * 1000 - payload.get("saved_ms", 0)) / 1000.0
+    logging.info(f"[snapshot] loaded {path} age={age_sec:.0f}s")
+    return payload["state"]
@@ -5,5 +5,15 @@ class Strategy:
         self.allow_short = bool(allow_short)
         self.params = params or {}
 
-    def target_weights(self, data_handler, prices: dict[str, float], liquidity: dict[str, float]) -> dict[str, float]:
+    def target_weights(self, data_handler, prices: dict[str, float], liquidity: dict[str, float],
+                       clock=None) -> dict[str, float]:
         raise NotImplementedError
+
+    def reset(self) -> None:
+        pass
+
+    def get_state(self):
+        return None
+
+    def set_state(self, state) -> None:
+        pass
@@ -4,8 +4,40 @@ import config
 from .base import Strategy
 from datetime import datetime, timezone
 
-_state = {}
-_open = {}
+
+class _PairState:
+    # per-pair breakout tracking for the current NY day
+    __slots__ = ("day", "broken")
+
+    def __init__(self, day, broken=None):
+        self.day = day
+        self.broken = broken          # None or (direction, break close)
+
+    def as_dict(self) -> dict:
+        return {"broken": self.broken, "day": self.day}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "_PairState":
+        broken = d.get("broken")
+        return cls(d.get("day"), tuple(broken) if broken else None)
+
+
+class _Position:
+    __slots__ = ("entry", "sl", "tp", "day", "w")
+
+    def __init__(self, entry: float, sl: float, tp: float, day, w: float):
+        self.entry = entry
+        self.sl = sl
+        self.tp = tp
+        self.day = day
+        self.w = w
+
+    def as_dict(self) -> dict:
+        return {"entry": self.entry, "sl": self.sl, "tp": self.tp, "day": self.day, "w": self.w}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "_Position":
+        return cls(d["entry"], d["sl"], d["tp"], d.get("day"), d["w"])
 
 def _apply_r_bounds(entry: float, sl: float, max_r: float, min_r: float):
     r_abs = abs(entry - sl)
@@ -33,24 +65,31 @@ def _post_cap(weights: dict[str, float], cap: float) -> dict[str, float]:
 class FourHrRange(Strategy):
     def __init__(self, allow_short: bool, params: dict | None = None):
         super().__init__("four_hr_range", False, params)
+        # state lives on the instance so several parameterisations can run side by side
+        self._state: dict[str, _PairState] = {}
+        self._open: dict[str, _Position] = {}
 
-    def target_weights(self, data_handler, prices, liquidity):
+    def target_weights(self, data_handler, prices, liquidity, clock=None):
         desired = {}
         alloc = float(self.params.get("trade_allocation_pct", 0.5))
         max_r = float(self.params.get("max_r_pct", getattr(config, "MAX_R_PCT", 0.01)))
         min_r = float(self.params.get("min_r_pct", getattr(config, "MIN_R_PCT", 0.002)))
         strict = bool(getattr(config, "STRICT_FIRST4H_ONLY", True))
-        
+
+        # one clock read per call; the session gate does not depend on the pair
+        tick = getattr(data_handler, "tick", None)
+        now = tick.utc if tick is not None else (clock.now() if clock is not None else datetime.now(timezone.utc))
+        after4h = data_handler.is_after_first4h_close()
+        gate_log = logging.getLogger().isEnabledFor(logging.INFO)
+        states, open_ = self._state, self._open
+
         for pair in list(prices.keys()):
-            now = datetime.now(timezone.utc)
-            if bool(getattr(config, "STRICT_FIRST4H_ONLY", True)):
-                if not data_handler.is_after_first4h_close() or not data_handler.first4h_ready(pair):
-                    logging.info(f"[four_hr_range] gate: after4h={data_handler.is_after_first4h_close()} ready={data_handler.first4h_ready(pair)} skip {pair} @ {now.isoformat()}")
+            if strict:
+                ready = data_handler.first4h_ready(pair)
+                if not after4h or not ready:
+                    if gate_log:
+                        logging.info(f"[four_hr_range] gate: after4h={after4h} ready={ready} skip {pair} @ {now.isoformat()}")
                     continue
-            if strict and not data_handler.is_after_first4h_close():
-                continue
-            if strict and not data_handler.first4h_ready(pair):
-                continue
             hi, lo, ny_date = data_handler.get_first4h_range(pair)
             if hi is None or lo is None or ny_date is None:
                 continue
@@ -59,40 +98,55 @@ class FourHrRange(Strategy):
             close = data_handler.get_5m_close(pair)
             if close is None:
                 continue
-            st = _state.get(pair, {"broken": None, "day": ny_date})
-            if st["day"] != ny_date:
-                st = {"broken": None, "day": ny_date}
-                _open.pop(pair, None)
-            if st["broken"] is None:
+            st = states.get(pair)
+            if st is None or st.day != ny_date:
+                st = states[pair] = _PairState(ny_date)
+                open_.pop(pair, None)
+            if st.broken is None:
                 if close < lo:
-                    st["broken"] = ("down", close)
+                    st.broken = ("down", close)
             else:
-                dirc, brk_px = st["broken"]
-                if dirc == "down" and close >= lo and pair not in _open:
+                dirc, brk_px = st.broken
+                if dirc == "down" and close >= lo and pair not in open_:
                     entry = close
                     sl0 = min(brk_px, lo)
                     adj = _apply_r_bounds(entry, sl0, max_r, min_r)
                     if adj[0] is not None:
                         sl, tp = adj
-                        _open[pair] = {"entry": entry, "sl": sl, "tp": tp, "day": ny_date, "w": abs(alloc)}
+                        open_[pair] = _Position(entry, sl, tp, ny_date, abs(alloc))
                         logging.info(f"[four_hr_range] entry {pair} entry={entry:.6f} sl={sl:.6f} tp={tp:.6f} w={alloc:.3f}")
-                    st["broken"] = None
-            _state[pair] = st
+                    st.broken = None
         to_remove = []
-        for pair, meta in list(_open.items()):
+        for pair, pos in open_.items():
             px = prices.get(pair)
             if px is None:
                 continue
-            if px <= meta["sl"] or px >= meta["tp"] or meta.get("day") != _state.get(pair, {}).get("day"):
-                logging.info(f"[four_hr_range] exit {pair} px={px:.6f} sl={meta['sl']:.6f} tp={meta['tp']:.6f}")
+            st = states.get(pair)
+            if px <= pos.sl or px >= pos.tp or st is None or pos.day != st.day:
+                logging.info(f"[four_hr_range] exit {pair} px={px:.6f} sl={pos.sl:.6f} tp={pos.tp:.6f}")
                 to_remove.append(pair)
             else:
-                desired[pair] = meta["w"]
+                desired[pair] = pos.w
         for pair in to_remove:
-            _open.pop(pair, None)
+            open_.pop(pair, None)
         if liquidity:
             desired = {p: w for p, w in desired.items() if liquidity.get(p, 0) >= config.MIN_24H_VOLUME}
         return _post_cap(desired, cap=getattr(config, "MAX_POSITION_PER_SYMBOL", 0.35))
 
+    def reset(self) -> None:
+        self._state.clear()
+        self._open.clear()
+
+    def get_state(self):
+        return {"state": {p: st.as_dict() for p, st in self._state.items()},
+                "open": {p: pos.as_dict() for p, pos in self._open.items()}}
+
+    def set_state(self, state) -> None:
+        self.reset()
+        if not state:
+            return
+        self._state.update({p: _PairState.from_dict(d) for p, d in state.get("state", {}).items()})
+        self._open.update({p: _Position.from_dict(d) for p, d in state.get("open", {}).items()})
+
 def build(allow_short: bool, params: dict | None = None):
     return FourHrRange(allow_short=False, params=params)
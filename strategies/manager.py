@@ -1,7 +1,11 @@
-# startegies/manager.py
-import importlib
+# strategies/manager.py
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from functools import partial
 import config
+import metrics
+from strategies import registry
 
 def _cap_and_normalize(weights: dict[str, float], cap: float) -> dict[str, float]:
     if not weights:
@@ -14,27 +18,93 @@ def _cap_and_normalize(weights: dict[str, float], cap: float) -> dict[str, float
         w = {k: v / total for k, v in w.items()}
     return w
 
+def _timed(strat, data_handler, prices, liquidity, clock):
+    t0 = time.perf_counter()
+    w = strat.target_weights(data_handler, prices, liquidity, clock=clock)
+    ms = (time.perf_counter() - t0) * 1000.0
+    metrics.observe("strategy_ms", ms, strategy=strat.name)
+    return w, ms
+
+def _timed_with_state(strat, data_handler, prices, liquidity, clock):
+    # the state copy is taken on the worker, right after the run, so it is always a finished one
+    w, ms = _timed(strat, data_handler, prices, liquidity, clock)
+    return w, ms, strat.get_state()
+
+
 class StrategyManager:
-    def __init__(self, allow_short: bool):
+    # parallel=True evaluates strategies on a thread pool over a detached snapshot of the data
+    # handler, each with its own deadline (spec "timeout_sec", default STRATEGY_TIMEOUT_SEC). A
+    # strategy that misses it, raises, or is still busy from an earlier cycle contributes its last
+    # good weights (STRATEGY_TIMEOUT_POLICY="reuse") or nothing ("drop"); the others are unaffected.
+    # parallel=False is the old inline loop (used by the backtester, which must stay deterministic).
+    def __init__(self, allow_short: bool, specs: list[dict] | None = None, parallel: bool | None = None,
+                 shared: bool = True):
         self.allow_short = allow_short
         self.strategies = []
-        for spec in getattr(config, "STRATEGIES", []):
-            name = spec["name"]
+        self.timeouts: list[float] = []
+        default_timeout = float(getattr(config, "STRATEGY_TIMEOUT_SEC", 2.0))
+        specs = getattr(config, "STRATEGIES", []) if specs is None else specs
+        for spec in specs:
             alloc = float(spec.get("alloc", 0.0))
-            params = spec.get("params", {})
-            mod = importlib.import_module(f"strategies.{name}")
-            cls = getattr(mod, "build")
-            s = cls(allow_short=self.allow_short, params=params)
+            s = registry.build(spec, allow_short=self.allow_short, shared=shared)
+            if any(s is other for other, _ in self.strategies):
+                # repeated identical spec: each entry keeps its own state
+                s = registry.build(spec, allow_short=self.allow_short, shared=False)
             self.strategies.append((s, alloc))
+            self.timeouts.append(float(spec.get("timeout_sec", default_timeout)))
+        self.needs = registry.data_needs(specs)
+        self.parallel = bool(getattr(config, "STRATEGY_PARALLEL", True) if parallel is None else parallel)
+        self.reuse_on_timeout = getattr(config, "STRATEGY_TIMEOUT_POLICY", "reuse") == "reuse"
+        self.last_timings: dict[str, float | None] = {}
+        self._last_weights: dict[int, dict] = {}
+        self._last_state: dict[int, object] = {}
+        self._running: dict = {}
+        self._pool: ThreadPoolExecutor | None = None
+
+    def reset(self) -> None:
+        for strat, _ in self.strategies:
+            strat.reset()
+
+    def _busy(self, i: int) -> bool:
+        fut = self._running.get(i)
+        return fut is not None and not fut.done()
+
+    def get_state(self) -> list:
+        # a worker that missed its deadline may still be mutating its strategy; save the state
+        # from that strategy's last finished run instead of reading it mid-update
+        return [(strat.name, self._last_state.get(i) if self._busy(i) else strat.get_state())
+                for i, (strat, _) in enumerate(self.strategies)]
+
+    def set_state(self, states: list) -> None:
+        # matched by position and name so a reordered / edited config never loads foreign state
+        for i, ((strat, _), (name, state)) in enumerate(zip(self.strategies, states or [])):
+            if strat.name == name:
+                strat.set_state(state)
+                self._last_state[i] = state
+            else:
+                logging.warning(f"[manager] snapshot strategy {name} does not match {strat.name}, skipped")
 
-    def combine(self, data_handler, prices: dict[str, float], liquidity: dict[str, float]) -> dict[str, float]:
+    def combine(self, data_handler, prices: dict[str, float], liquidity: dict[str, float],
+                clock=None) -> dict[str, float]:
+        clock = clock or getattr(data_handler, "clock", None)
+        if clock is not None and hasattr(data_handler, "begin_tick"):
+            data_handler.begin_tick(clock.tick_time())
+        if self.parallel and self.strategies:
+            results = self._run_parallel(data_handler, prices, liquidity, clock)
+        else:
+            results = []
+            for strat, _ in self.strategies:
+                w, ms = _timed(strat, data_handler, prices, liquidity, clock)
+                self.last_timings[strat.name] = ms
+                results.append(w)
         total = {}
         debug_on = bool(getattr(config, "DEBUG_LOG_WEIGHTS", False))
         topn = int(getattr(config, "DEBUG_TOP_N", 5))
         if debug_on:
             logging.info("== strategy breakdown begin ==")
-        for strat, alloc in self.strategies:
-            w = strat.target_weights(data_handler, prices, liquidity)
+            logging.info("[manager] compute_ms " + ", ".join(
+                f"{k}={'timeout' if v is None else f'{v:.1f}'}" for k, v in self.last_timings.items()))
+        for (strat, alloc), w in zip(self.strategies, results):
             if debug_on:
                 if not w:
                     logging.info(f"[{strat.name}] no picks")
@@ -54,3 +124,57 @@ class StrategyManager:
                 logging.info("[final] combined: " + ", ".join(f"{k}:{v:+.3f}" for k,v in picks))
             logging.info("== strategy breakdown end ==")
         return total
+
+    def _fallback(self, i: int) -> dict:
+        return self._last_weights.get(i, {}) if self.reuse_on_timeout else {}
+
+    def _remember(self, i: int, fut) -> None:
+        # runs when a worker finishes, even after its deadline, so "reuse" gets the freshest result
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        w, ms, state = fut.result()
+        self._last_weights[i] = w or {}
+        self._last_state[i] = state
+        self.last_timings[self.strategies[i][0].name] = ms
+
+    def _run_parallel(self, data_handler, prices, liquidity, clock) -> list[dict]:
+        if self._pool is None:
+            workers = int(getattr(config, "STRATEGY_MAX_WORKERS", 0) or len(self.strategies))
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="strategy")
+        view = data_handler.snapshot() if hasattr(data_handler, "snapshot") else data_handler
+        prices, liquidity = dict(prices), dict(liquidity or {})
+
+        t0 = time.monotonic()
+        results: list[dict] = [{} for _ in self.strategies]
+        futures = {}
+        for i, (strat, _) in enumerate(self.strategies):
+            if self._busy(i):
+                logging.warning(f"[manager] {strat.name} still busy from an earlier cycle, not resubmitted")
+                metrics.inc("strategy_timeouts_total", strategy=strat.name)
+                results[i] = self._fallback(i)
+                continue
+            fut = self._pool.submit(_timed_with_state, strat, view, prices, liquidity, clock)
+            fut.add_done_callback(partial(self._remember, i))
+            self._running[i] = futures[i] = fut
+
+        for i, fut in futures.items():
+            strat = self.strategies[i][0]
+            try:
+                w, _, _ = fut.result(timeout=max(0.0, t0 + self.timeouts[i] - time.monotonic()))
+                results[i] = w
+            except FuturesTimeout:
+                logging.warning(f"[manager] {strat.name} missed its {self.timeouts[i]:.2f}s deadline, "
+                                f"{'reusing last weights' if self.reuse_on_timeout else 'dropped'}")
+                metrics.inc("strategy_timeouts_total", strategy=strat.name)
+                self.last_timings[strat.name] = None
+                results[i] = self._fallback(i)
+            except Exception:
+                logging.exception(f"[manager] {strat.name} failed")
+                metrics.inc("strategy_errors_total", strategy=strat.name)
+                results[i] = self._fallback(i)
+        return results
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,118 @@
+# strategies/registry.py
+import importlib
+import json
+import logging
+import threading
+
+import config
+
+# Strategy plugins are declared here (or via register()) with the data they need, so the engine
+# can size its fetches before any strategy module is imported. Modules are imported on first
+# build() and instances are kept for the life of the process, keyed by name + params.
+
+
+class StrategyInfo:
+    __slots__ = ("name", "module", "lookback_hours", "interval", "assets")
+
+    def __init__(self, name: str, module: str | None = None, lookback_hours: float | None = None,
+                 interval: str | None = None, assets: list[str] | None = None):
+        self.name = name
+        self.module = module or f"strategies.{name}"
+        self.lookback_hours = lookback_hours      # None = config.LOOKBACK_HOURS
+        self.interval = interval                  # None = config.HORUS_INTERVAL
+        self.assets = set(assets) if assets else None   # None = whatever the universe holds
+
+    def __repr__(self) -> str:
+        return (f"StrategyInfo({self.name}, module={self.module}, lookback_hours={self.lookback_hours}, "
+                f"interval={self.interval}, assets={sorted(self.assets) if self.assets else None})")
+
+
+_INFOS: dict[str, StrategyInfo] = {}
+_MODULES: dict[str, object] = {}
+_INSTANCES: dict[tuple, object] = {}
+_lock = threading.Lock()
+
+
+def register(name: str, module: str | None = None, lookback_hours: float | None = None,
+             interval: str | None = None, assets: list[str] | None = None) -> StrategyInfo:
+    info = StrategyInfo(name, module, lookback_hours, interval, assets)
+    _INFOS[name] = info
+    return info
+
+
+# built-in strategies
+# four_hr_range needs the whole current NY day back to 00:00 NY (first-4h window + breakout)
+register("four_hr_range", lookback_hours=24)
+
+
+def get_info(name: str) -> StrategyInfo:
+    info = _INFOS.get(name)
+    if info is None:
+        # undeclared: conventional module path and the global data defaults
+        info = register(name)
+    return info
+
+
+def _load(info: StrategyInfo):
+    mod = _MODULES.get(info.module)
+    if mod is None:
+        mod = _MODULES[info.module] = importlib.import_module(info.module)
+    return mod
+
+
+def build(spec: dict, allow_short: bool, shared: bool = True):
+    # shared=False always returns a fresh instance (backtests, sweeps)
+    name = spec["name"]
+    params = spec.get("params", {})
+    info = get_info(name)
+    key = (name, json.dumps(params, sort_keys=True, default=str), bool(allow_short))
+    with _lock:
+        if shared and key in _INSTANCES:
+            return _INSTANCES[key]
+        inst = getattr(_load(info), "build")(allow_short=allow_short, params=params)
+        if shared:
+            _INSTANCES[key] = inst
+        return inst
+
+
+def _interval_minutes(interval: str) -> float:
+    unit = interval[-1].lower()
+    n = float(interval[:-1])
+    return n * {"m": 1, "h": 60, "d": 1440}.get(unit, 1)
+
+
+class DataNeeds:
+    # union of what the active strategies declared
+    __slots__ = ("lookback_hours", "interval", "assets")
+
+    def __init__(self, lookback_hours: float, interval: str, assets: set[str] | None):
+        self.lookback_hours = lookback_hours
+        self.interval = interval
+        self.assets = assets
+
+    def wants(self, asset: str) -> bool:
+        return self.assets is None or asset.upper() in self.assets
+
+    def __repr__(self) -> str:
+        return (f"DataNeeds(lookback_hours={self.lookback_hours}, interval={self.interval}, "
+                f"assets={sorted(self.assets) if self.assets is not None else 'any'})")
+
+
+def data_needs(specs: list[dict]) -> DataNeeds:
+    default_lookback = float(getattr(config, "LOOKBACK_HOURS", 24))
+    default_interval = getattr(config, "HORUS_INTERVAL", "15m")
+    if not specs:
+        return DataNeeds(0.0, default_interval, set())
+    infos = [get_info(s["name"]) for s in specs]
+    lookback = max(i.lookback_hours if i.lookback_hours is not None else default_lookback for i in infos)
+    intervals = {i.interval or default_interval for i in infos}
+    interval = min(intervals, key=_interval_minutes)
+    if len(intervals) > 1:
+        logging.warning(f"[registry] strategies declare intervals {sorted(intervals)}, fetching the finest {interval}")
+    assets: set[str] | None = set()
+    for i in infos:
+        if i.assets is None:
+            assets = None
+            break
+        assets |= {a.upper() for a in i.assets}
+    return DataNeeds(lookback, interval, assets)
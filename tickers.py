@@ -0,0 +1,94 @@
+# tickers.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+
+import config
+
+
+class Ticker:
+    # one entry of Roostoo /v3/ticker Data; volume_24h is UnitTradeValue (24h value in USD)
+    __slots__ = ("pair", "last", "bid", "ask", "volume_24h", "change")
+
+    def __init__(self, pair: str, last: float, bid: float, ask: float, volume_24h: float, change: float):
+        self.pair = pair
+        self.last = last
+        self.bid = bid
+        self.ask = ask
+        self.volume_24h = volume_24h
+        self.change = change
+
+    @property
+    def spread(self) -> float | None:
+        # relative bid/ask spread, None when either side is missing
+        if self.bid <= 0 or self.ask <= 0:
+            return None
+        mid = (self.bid + self.ask) / 2.0
+        return (self.ask - self.bid) / mid
+
+    def __repr__(self) -> str:
+        return f"Ticker({self.pair}, last={self.last}, vol24h={self.volume_24h:.0f})"
+
+
+def _f(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_tickers(raw: dict) -> dict[str, Ticker]:
+    if not raw or not raw.get("Success", True):
+        raise RuntimeError(f"ticker failed: {raw}")
+    out: dict[str, Ticker] = {}
+    for pair, d in (raw.get("Data") or {}).items():
+        if not isinstance(d, dict):
+            continue
+        out[pair] = Ticker(
+            pair,
+            last=_f(d.get("LastPrice")),
+            bid=_f(d.get("MaxBid")),
+            ask=_f(d.get("MinAsk")),
+            volume_24h=_f(d.get("UnitTradeValue")),
+            change=_f(d.get("Change")),
+        )
+    return out
+
+
+class TickerService:
+    # one bulk /v3/ticker call per cycle. refresh() is called at the start of a cycle; everything
+    # later in that cycle reads the same snapshot. A failed refresh keeps the previous snapshot
+    # for up to max_stale_sec so one bad call does not blank out prices and volumes.
+    def __init__(self, exchange_client, max_stale_sec: float | None = None):
+        self.client = exchange_client
+        self.max_stale_sec = float(getattr(config, "TICKER_MAX_STALE_SEC", 900) if max_stale_sec is None
+                                   else max_stale_sec)
+        self._snap: dict[str, Ticker] = {}
+        self._fetched_at: float | None = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> dict[str, Ticker]:
+        try:
+            snap = parse_tickers(self.client.get_all_tickers())
+        except Exception as e:
+            logging.warning(f"[tickers] refresh failed: {e}")
+            return self.snapshot()
+        with self._lock:
+            self._snap = snap
+            self._fetched_at = time.monotonic()
+        return snap
+
+    async def refresh_async(self) -> dict[str, Ticker]:
+        return await asyncio.to_thread(self.refresh)
+
+    def snapshot(self) -> dict[str, Ticker]:
+        with self._lock:
+            if self._fetched_at is None or time.monotonic() - self._fetched_at > self.max_stale_sec:
+                return {}
+            return self._snap
+
+    def last_prices(self) -> dict[str, float]:
+        return {p: t.last for p, t in self.snapshot().items() if t.last > 0}
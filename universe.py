@@ -0,0 +1,77 @@
+# universe.py
+from __future__ import annotations
+
+import logging
+import time
+
+import config
+from horus_client import SUPPORTED_ASSETS
+
+
+class UniverseSelector:
+    # ranks every Horus-supported USD pair from the bulk ticker snapshot (24h value traded, then
+    # spread) and keeps the top_k. Only the selected pairs get full Horus history, so coverage
+    # can grow without the per-cycle fetch growing with it. Re-ranked every refresh_sec; pinned
+    # pairs and pairs we still hold are always kept so exits are never orphaned.
+    def __init__(
+        self,
+        tickers,
+        exchange_info=None,
+        top_k: int | None = None,
+        refresh_sec: float | None = None,
+        min_volume: float | None = None,
+        max_spread: float | None = None,
+        pinned: list[str] | None = None,
+        supported: set[str] | None = None,
+    ):
+        self.tickers = tickers
+        self.exchange_info = exchange_info
+        self.top_k = int(top_k or getattr(config, "UNIVERSE_TOP_K", 15))
+        self.refresh_sec = float(refresh_sec or getattr(config, "UNIVERSE_REFRESH_SEC", 3600))
+        self.min_volume = float(getattr(config, "UNIVERSE_MIN_VOLUME", 0.0) if min_volume is None else min_volume)
+        self.max_spread = float(getattr(config, "UNIVERSE_MAX_SPREAD", 0.005) if max_spread is None else max_spread)
+        self.pinned = list(getattr(config, "UNIVERSE_PINNED", []) if pinned is None else pinned)
+        self.supported = SUPPORTED_ASSETS if supported is None else supported
+        self._selected_at: float | None = None
+
+    def due(self) -> bool:
+        return self._selected_at is None or time.monotonic() - self._selected_at >= self.refresh_sec
+
+    def rank(self) -> list[tuple[str, float, float]]:
+        # [(pair, volume_24h, spread)] best first
+        snap = self.tickers.snapshot()
+        rules = self.exchange_info.rules() if self.exchange_info is not None else {}
+        ranked = []
+        for pair, t in snap.items():
+            base, _, quote = pair.partition("/")
+            if quote != "USD" or base not in self.supported:
+                continue
+            rule = rules.get(pair)
+            if rule is not None and not rule.can_trade:
+                continue
+            if t.last <= 0 or t.volume_24h < self.min_volume:
+                continue
+            spread = t.spread
+            if spread is None or spread > self.max_spread:
+                continue
+            ranked.append((pair, t.volume_24h, spread))
+        ranked.sort(key=lambda r: (-r[1], r[2]))
+        return ranked
+
+    def select(self, current: list[tuple[str, str]], keep: set[str] | None = None) -> list[tuple[str, str]]:
+        # returns the new universe as (pair, asset); keeps `current` when there is no ticker data
+        ranked = self.rank()
+        if not ranked:
+            logging.warning("[universe] no ticker data to rank, keeping current universe")
+            return current
+        self._selected_at = time.monotonic()
+        chosen = list(dict.fromkeys(self.pinned))
+        for pair, _, _ in ranked:
+            if len(chosen) >= self.top_k:
+                break
+            if pair not in chosen:
+                chosen.append(pair)
+        for pair in sorted(keep or ()):
+            if pair not in chosen:
+                chosen.append(pair)
+        return [(pair, pair.split("/")[0]) for pair in chosen]